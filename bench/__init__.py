@@ -0,0 +1,4 @@
+"""
+Benchmark harness for the API, run against local stand-ins for Gemini,
+Wikimedia Commons and the YouTube Data API. See ``python -m bench --help``.
+"""
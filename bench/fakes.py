@@ -0,0 +1,262 @@
+"""
+In-process stand-ins for the external services the app calls.
+
+- Gemini: both the LangChain chat model and ``google.generativeai`` models answer
+  from canned responses chosen by prompt content. Latency and error injection
+  are configurable.
+- Wikimedia Commons and image downloads: ``requests`` is served from recorded
+  HTML fixtures and a generated PNG. It sleeps synchronously, like real blocking I/O.
+- YouTube Data API: the async client is routed through an ``httpx.MockTransport``.
+
+``install_fakes`` patches everything at the client-class level, so services
+created before or after installation are both covered.
+"""
+
+import asyncio
+import io
+import json
+import random
+import re
+import struct
+import time
+import zlib
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterator, Optional
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@dataclass
+class FakeConfig:
+    gemini_latency_ms: float = 400.0
+    gemini_jitter_ms: float = 150.0
+    gemini_error_rate: float = 0.0
+    http_latency_ms: float = 40.0
+    youtube_latency_ms: float = 60.0
+    youtube_error_rate: float = 0.0
+
+
+class ServiceUnavailable(Exception):
+    """Injected Gemini failure. The name matches what the retry policy treats as transient."""
+
+    code = 503
+
+
+def _png_bytes(width: int = 64, height: int = 48, color=(200, 120, 40)) -> bytes:
+    """Build a valid solid-colour RGB PNG without any imaging library."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(color) * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+FIXTURE_IMAGE = _png_bytes()
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+# ---------------------------------------------------------------------------
+
+def _prompt_text(value: Any) -> str:
+    """Collect the text parts of whatever a service passed to the model."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(_prompt_text(item) for item in value)
+    if isinstance(value, dict):
+        return value.get("text", "") if isinstance(value.get("text"), str) else ""
+    if hasattr(value, "parts"):
+        return "\n".join(getattr(part, "text", "") or "" for part in value.parts)
+    if hasattr(value, "content"):
+        return _prompt_text(value.content)
+    return ""
+
+
+def _target_province(prompt: str) -> str:
+    match = re.search(r"from (.+?) province in Indonesia", prompt)
+    return match.group(1) if match else "Bali"
+
+
+def canned_response(prompt: str) -> str:
+    """Answer in the shape each prompt template asks for."""
+    if "Return ONLY the search query" in prompt:
+        return "tari kecak"
+    if "detected_province" in prompt:
+        return json.dumps({
+            "confidence": 0.88,
+            "detected_province": _target_province(prompt),
+            "detected_category": "traditional dance",
+        })
+    if "confidence score between" in prompt:
+        return "0.86"
+    if "pakar budaya Indonesia" in prompt:
+        return json.dumps({
+            "province": "Bali",
+            "confidence": 0.82,
+            "reasoning": "Kostum dan formasi penari melingkar khas tari kecak dari Bali.",
+        })
+    return (
+        "Kecak is performed by a circle of dozens of men chanting 'cak' in interlocking rhythms. "
+        "It retells episodes of the Ramayana. Keep exploring Indonesia's rich traditions!"
+    )
+
+
+class FakeGemini:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.calls = 0
+        self.errors = 0
+
+    async def respond(self, request: Any) -> str:
+        self.calls += 1
+        latency = max(0.0, random.gauss(self.config.gemini_latency_ms, self.config.gemini_jitter_ms)) / 1000
+        await asyncio.sleep(latency)
+        if random.random() < self.config.gemini_error_rate:
+            self.errors += 1
+            raise ServiceUnavailable("injected Gemini failure")
+        return canned_response(_prompt_text(request))
+
+    async def langchain_response(self, messages: Any):
+        from langchain_core.messages import AIMessage
+
+        text = await self.respond(messages)
+        prompt_tokens = len(_prompt_text(messages)) // 4
+        output_tokens = len(text) // 4
+        return AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": prompt_tokens + output_tokens,
+            },
+        )
+
+    async def genai_response(self, contents: Any):
+        text = await self.respond(contents)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(_prompt_text(contents)) // 4,
+                candidates_token_count=len(text) // 4,
+            ),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Wikimedia Commons and image hosts (requests)
+# ---------------------------------------------------------------------------
+
+class FixtureHTTP:
+    """Serves ``requests`` traffic from fixtures; unknown hosts get a 404."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.calls = 0
+        self.search_html = (FIXTURES_DIR / "wikimedia_search.html").read_bytes()
+        self.file_page_html = (FIXTURES_DIR / "wikimedia_file_page.html").read_bytes()
+
+    def route(self, method: str, url: str):
+        parsed = urlparse(url)
+        if parsed.netloc == "commons.wikimedia.org":
+            if parsed.path == "/w/index.php":
+                return 200, "text/html; charset=UTF-8", self.search_html
+            if parsed.path.startswith("/wiki/File:"):
+                return 200, "text/html; charset=UTF-8", self.file_page_html
+        if parsed.netloc in ("upload.wikimedia.org", "i.ytimg.com", "bench.example"):
+            return 200, "image/png", FIXTURE_IMAGE
+        return 404, "text/plain", b"not found"
+
+    def send(self, adapter: requests.adapters.HTTPAdapter, request: requests.PreparedRequest) -> requests.Response:
+        self.calls += 1
+        time.sleep(self.config.http_latency_ms / 1000)
+        status, content_type, body = self.route(request.method, request.url)
+
+        response = requests.Response()
+        response.status_code = status
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if status < 400 else "Not Found"
+        response.headers = CaseInsensitiveDict({"content-type": content_type, "content-length": str(len(body))})
+        response.raw = io.BytesIO(b"" if request.method == "HEAD" else body)
+        response.encoding = "utf-8" if content_type.startswith("text/") else None
+        response.connection = adapter
+        return response
+
+
+# ---------------------------------------------------------------------------
+# YouTube Data API (httpx)
+# ---------------------------------------------------------------------------
+
+class FakeYouTube:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.calls = 0
+        self.search_response = json.loads((FIXTURES_DIR / "youtube_search.json").read_text())
+        self.videos_response = json.loads((FIXTURES_DIR / "youtube_videos.json").read_text())
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.config.youtube_latency_ms / 1000)
+        if random.random() < self.config.youtube_error_rate:
+            return httpx.Response(503, json={"error": {"message": "injected YouTube failure"}})
+
+        if request.url.path.endswith("/search"):
+            return httpx.Response(200, json=self.search_response)
+        if request.url.path.endswith("/videos"):
+            ids = set(parse_qs(request.url.query.decode()).get("id", [""])[0].split(","))
+            items = [item for item in self.videos_response["items"] if item["id"] in ids]
+            return httpx.Response(200, json=dict(self.videos_response, items=items))
+        return httpx.Response(404, json={"error": {"message": "unknown endpoint"}})
+
+
+@contextmanager
+def install_fakes(config: Optional[FakeConfig] = None) -> Iterator[SimpleNamespace]:
+    """Patch the Gemini, ``requests`` and YouTube client layers for the duration of the block."""
+    from google.generativeai import GenerativeModel
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from services.youtube_client import AsyncYouTubeClient
+
+    config = config or FakeConfig()
+    gemini = FakeGemini(config)
+    http = FixtureHTTP(config)
+    youtube = FakeYouTube(config)
+    youtube_transport = httpx.MockTransport(youtube.handle)
+    original_get_client = AsyncYouTubeClient._get_client
+
+    # Plain functions so they bind like the methods they replace
+    async def ainvoke(model, messages, *args, **kwargs):
+        return await gemini.langchain_response(messages)
+
+    async def generate_content_async(model, contents=None, *args, **kwargs):
+        return await gemini.genai_response(contents)
+
+    def send(adapter, request, *args, **kwargs):
+        return http.send(adapter, request)
+
+    def get_youtube_client(client):
+        client.transport = youtube_transport
+        return original_get_client(client)
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(ChatGoogleGenerativeAI, "ainvoke", ainvoke))
+        stack.enter_context(mock.patch.object(GenerativeModel, "generate_content_async", generate_content_async))
+        stack.enter_context(mock.patch.object(requests.adapters.HTTPAdapter, "send", send))
+        stack.enter_context(mock.patch.object(AsyncYouTubeClient, "_get_client", get_youtube_client))
+        yield SimpleNamespace(config=config, gemini=gemini, http=http, youtube=youtube)
@@ -0,0 +1,200 @@
+"""
+Closed-loop load generator that drives the app in-process through ``httpx.ASGITransport``.
+
+A fixed number of workers issue requests back to back. For each scenario it reports
+throughput, latency percentiles, and how long the event loop was blocked. The loop
+monitor is a task that sleeps a short, fixed interval and records how late it wakes
+up, so a synchronous call in an async handler shows up as block time.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Configure the app for offline use before anything imports it
+os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="culturate-bench-"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Every fixture image is the same photo, so dedupe would reject all but the first
+os.environ.setdefault("SCRAPE_DEDUPE_IMAGES", "false")
+# Background guesses would compete with the guess scenario for the fake model
+os.environ.setdefault("SCRAPE_PRECOMPUTE_GUESSES", "false")
+
+import httpx
+
+from bench.fakes import FakeConfig, install_fakes
+from bench.scenarios import SCENARIOS, Scenario
+
+LOOP_MONITOR_INTERVAL = 0.005
+LOOP_BLOCK_THRESHOLD = 0.010
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoopMonitor:
+    """Measures event-loop lag by timing a short sleep over and over."""
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = LOOP_BLOCK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked_seconds = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.blocked_seconds += lag
+                self.stalls += 1
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    loop_blocked: float = 0.0
+    loop_max_lag: float = 0.0
+    loop_stalls: int = 0
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def summary_row(self) -> str:
+        latencies = sorted(self.latencies)
+        return (
+            f"{self.name:<14} {self.requests:>6} {self.errors:>6} {self.rps:>8.1f} "
+            f"{percentile(latencies, 0.50) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.0f} {self.loop_blocked * 1000:>9.0f} "
+            f"{self.loop_max_lag * 1000:>8.1f} {self.loop_stalls:>6}"
+        )
+
+
+SUMMARY_HEADER = (
+    f"{'scenario':<14} {'reqs':>6} {'errors':>6} {'rps':>8} "
+    f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'blocked ms':>9} {'max lag':>8} {'stalls':>6}"
+)
+
+
+async def run_scenario(app, scenario: Scenario, total_requests: int, concurrency: int, timeout: float) -> ScenarioResult:
+    result = ScenarioResult(scenario.name)
+    monitor = LoopMonitor()
+    next_index = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+        async def worker():
+            nonlocal next_index
+            while next_index < total_requests:
+                index = next_index
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.request(scenario.method, scenario.path, **scenario.build(index))
+                    failed = response.status_code >= 400
+                except Exception:
+                    failed = True
+                result.latencies.append(time.perf_counter() - start)
+                result.requests += 1
+                result.errors += failed
+
+        monitor.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+    result.loop_blocked = monitor.blocked_seconds
+    result.loop_max_lag = monitor.max_lag
+    result.loop_stalls = monitor.stalls
+    return result
+
+
+async def run(args: argparse.Namespace) -> List[ScenarioResult]:
+    config = FakeConfig(
+        gemini_latency_ms=args.gemini_latency_ms,
+        gemini_jitter_ms=args.gemini_jitter_ms,
+        gemini_error_rate=args.gemini_error_rate,
+        http_latency_ms=args.http_latency_ms,
+        youtube_latency_ms=args.youtube_latency_ms,
+        youtube_error_rate=args.youtube_error_rate,
+    )
+
+    results = []
+    with install_fakes(config) as fakes:
+        from main import app
+
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            if args.warmup:
+                await run_scenario(app, scenario, args.warmup, min(args.concurrency, args.warmup), args.timeout)
+            results.append(await run_scenario(app, scenario, args.requests, args.concurrency, args.timeout))
+
+        print(f"fake calls: gemini={fakes.gemini.calls} (errors {fakes.gemini.errors}), "
+              f"http={fakes.http.calls}, youtube={fakes.youtube.calls}", file=sys.stderr)
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark the API against local fakes.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="concurrent workers")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout in seconds")
+    parser.add_argument("--gemini-latency-ms", type=float, default=FakeConfig.gemini_latency_ms)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=FakeConfig.gemini_jitter_ms)
+    parser.add_argument("--gemini-error-rate", type=float, default=FakeConfig.gemini_error_rate)
+    parser.add_argument("--http-latency-ms", type=float, default=FakeConfig.http_latency_ms,
+                        help="blocking latency of each Wikimedia/image request")
+    parser.add_argument("--youtube-latency-ms", type=float, default=FakeConfig.youtube_latency_ms)
+    parser.add_argument("--youtube-error-rate", type=float, default=FakeConfig.youtube_error_rate)
+    parser.add_argument("-o", "--output", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+
+    report = "\n".join([SUMMARY_HEADER] + [result.summary_row() for result in results]) + "\n"
+    print(report, end="")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
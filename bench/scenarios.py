@@ -0,0 +1,77 @@
+"""
+Request scenarios for the benchmark runner.
+
+Each scenario builds the ``i``-th request from its index. Media URLs rotate over
+a small pool, so concurrent requests partly overlap, as they do in real games,
+without every request collapsing into one coalesced call.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict
+
+MEDIA_URL_POOL_SIZE = 25
+
+
+def _media_url(i: int) -> str:
+    return f"https://upload.wikimedia.org/wikipedia/commons/a/a1/Kecak_dance_{i % MEDIA_URL_POOL_SIZE}.jpg"
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    build: Callable[[int], Dict[str, Any]] = field(default=lambda i: {})
+
+
+def _guess(i: int) -> Dict[str, Any]:
+    return {"json": {"input_url": _media_url(i), "actual_province": "Bali"}}
+
+
+def _simulate(i: int) -> Dict[str, Any]:
+    return {"params": {"media_url": _media_url(i)}}
+
+
+def _chat(i: int) -> Dict[str, Any]:
+    return {
+        "json": {
+            "cultural_item": {
+                "id": f"item-{i % 10}",
+                "title": "Tari Kecak",
+                "type": "traditional dance",
+                "province": "Bali",
+                "description": "A Balinese dance drama performed by a chanting circle of men.",
+                "image": _media_url(i),
+            },
+            "user_message": "Why do the dancers chant 'cak'?",
+            "chat_history": [
+                {"role": "user", "message": "What is this dance?"},
+                {"role": "bot", "message": "It's the Kecak dance from Bali."},
+            ],
+        }
+    }
+
+
+def _match_summary(i: int) -> Dict[str, Any]:
+    rounds = [
+        {
+            "playerCorrect": round_index % 2 == 0,
+            "correctAnswer": province,
+            "playerAnswer": "Bali",
+            "culturalData": {"cultural_category": "traditional dance", "cultural_context": f"Round {round_index} context"},
+        }
+        for round_index, province in enumerate(["Bali", "Jawa Barat", "Aceh", "Papua", "Sumatera Barat"], 1)
+    ]
+    return {"json": rounds}
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("scrape", "GET", "/scrape/cultural-media"),
+        Scenario("guess", "POST", "/game/guess", _guess),
+        Scenario("simulate", "GET", "/game/simulate", _simulate),
+        Scenario("chat", "POST", "/chatbot/ask", _chat),
+        Scenario("match-summary", "POST", "/match-summary", _match_summary),
+    ]
+}
@@ -1,15 +1,22 @@
-from fastapi import APIRouter
-from models.cultural_item import ChatRequest, CulturalItem
-from services.chatbot_service import get_chat_response
+from fastapi import APIRouter, Depends, HTTPException
+from models.cultural_item import ChatRequest, ChatResponse
+from services.gemini.exceptions import GeminiServiceException
+from utils.lazy import lazy_import
 
 chatbot_router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
+# Imported on the first request; the module configures the Gemini SDK at import
+get_chatbot_service = lazy_import("services.chatbot_service")
+
 @chatbot_router.post("/ask")
-def chat_with_gemini(request: ChatRequest):
-    return {
-        "response": get_chat_response(
+async def chat_with_gemini(request: ChatRequest, chatbot_service=Depends(get_chatbot_service)) -> ChatResponse:
+    try:
+        response = await chatbot_service.get_chat_response(
             item=request.cultural_item,
             user_message=request.user_message,
             history=request.chat_history
         )
-    }
\ No newline at end of file
+    except GeminiServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    return ChatResponse(response=response)
\ No newline at end of file
@@ -1,37 +1,126 @@
-from fastapi import APIRouter, Body
-from services.cultural_media_location_service import CulturalMediaLocationService
-from services.challenge_service import ChallengeService
-from models.guess_request import GuessRequest
+import asyncio
+import os
+from fastapi import APIRouter, Body, Depends
+from models.guess_request import (
+    BatchGuessRequest,
+    BatchGuessResponse,
+    BatchGuessResult,
+    GuessRequest,
+    GuessResponse,
+)
+from utils.lazy import Lazy
+from utils.metrics import record_guess_result
+from utils.provinces import canonical_province, provinces_match
 
 competitor_router =  APIRouter(prefix="/game", tags=["Game"])
 
-media_service = CulturalMediaLocationService()
-challenge_service = ChallengeService()
+def _create_media_service():
+    from services.cultural_media_location_service import CulturalMediaLocationService
+    return CulturalMediaLocationService()
+
+def _create_challenge_service():
+    from services.challenge_service import ChallengeService
+    return ChallengeService()
+
+# Built on the first request so the Gemini SDKs stay out of startup
+get_media_service = Lazy(_create_media_service)
+get_challenge_service = Lazy(_create_challenge_service)
+
+# Maximum number of items of one batch whose media is fetched and guessed at once
+BATCH_GUESS_CONCURRENCY = int(os.getenv("BATCH_GUESS_CONCURRENCY", 4))
 
 @competitor_router.post("/guess")
-async def guess_province(request: GuessRequest = Body(...)):
+async def guess_province(
+    request: GuessRequest = Body(...),
+    media_service=Depends(get_media_service),
+    challenge_service=Depends(get_challenge_service),
+) -> GuessResponse:
     input_url = request.input_url
-    actual_province = request.actual_province
+    actual_province = canonical_province(request.actual_province) or request.actual_province
+    threshold = await challenge_service.get_current_difficulty()
+    difficulty = challenge_service.map_threshold_to_difficulty(threshold)
 
     # AI Prediction with difficulty
     ai_result = await media_service.predict_province_from_input(
         media_url=input_url,
-        difficulty=challenge_service.map_threshold_to_difficulty(),
+        difficulty=difficulty,
         use_chain_of_thought=True
     )
 
     # Evaluation
-    ai_correct = ai_result.province_guess.lower() == actual_province.lower()
+    ai_correct = provinces_match(ai_result.province_guess, actual_province)
+    record_guess_result(ai_result.tier, difficulty, ai_correct)
 
     # Update difficulty
-    challenge_service.update_difficulty(ai_correct)
-
-    return {
-        "actual_province": actual_province,
-        "ai_guess": ai_result.province_guess,
-        "ai_confidence": ai_result.confidence,
-        "ai_correct": ai_correct,
-        "current_difficulty": challenge_service.get_current_difficulty(),
-        "ai_reasoning": ai_result.reasoning,
-        "error": ai_result.error
-    }
\ No newline at end of file
+    threshold = await challenge_service.update_difficulty(ai_correct, threshold)
+
+    return GuessResponse(
+        actual_province=actual_province,
+        ai_guess=ai_result.province_guess,
+        ai_confidence=ai_result.confidence,
+        ai_correct=ai_correct,
+        current_difficulty=threshold,
+        ai_reasoning=ai_result.reasoning,
+        error=ai_result.error,
+    )
+
+@competitor_router.post("/guess/batch")
+async def guess_province_batch(
+    request: BatchGuessRequest = Body(...),
+    media_service=Depends(get_media_service),
+    challenge_service=Depends(get_challenge_service),
+) -> BatchGuessResponse:
+    threshold = await challenge_service.get_current_difficulty()
+    difficulty = challenge_service.map_threshold_to_difficulty(threshold)
+    semaphore = asyncio.Semaphore(BATCH_GUESS_CONCURRENCY)
+
+    async def predict(item: GuessRequest):
+        async with semaphore:
+            return await media_service.predict_province_from_input(
+                media_url=item.input_url,
+                difficulty=difficulty,
+                use_chain_of_thought=True
+            )
+
+    ai_results = await asyncio.gather(
+        *(predict(item) for item in request.items),
+        return_exceptions=True
+    )
+
+    results = []
+    outcomes = []
+    for item, ai_result in zip(request.items, ai_results):
+        actual_province = canonical_province(item.actual_province) or item.actual_province
+
+        if isinstance(ai_result, Exception):
+            results.append(BatchGuessResult(
+                input_url=item.input_url,
+                actual_province=actual_province,
+                error=str(ai_result),
+            ))
+            continue
+
+        ai_correct = None
+        if actual_province is not None:
+            ai_correct = provinces_match(ai_result.province_guess, actual_province)
+            record_guess_result(ai_result.tier, difficulty, ai_correct)
+            outcomes.append(ai_correct)
+
+        results.append(BatchGuessResult(
+            input_url=item.input_url,
+            actual_province=actual_province,
+            ai_guess=ai_result.province_guess,
+            ai_confidence=ai_result.confidence,
+            ai_correct=ai_correct,
+            ai_reasoning=ai_result.reasoning,
+            error=ai_result.error,
+        ))
+
+    # Update difficulty once for the whole batch
+    threshold = await challenge_service.update_difficulty_batch(outcomes, threshold)
+
+    return BatchGuessResponse(
+        difficulty=difficulty,
+        current_difficulty=threshold,
+        results=results,
+    )
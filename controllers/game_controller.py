@@ -1,22 +1,26 @@
-from fastapi import APIRouter, Query
-from services.challenge_service import ChallengeService
+from fastapi import APIRouter, Depends, Query
+from models.guess_request import DifficultyResponse, SimulatedGuessResponse
+from utils.lazy import Lazy
 
 game_router = APIRouter()
-challenge_service = ChallengeService()
+
+def _create_challenge_service():
+    from services.challenge_service import ChallengeService
+    return ChallengeService()
+
+get_challenge_service = Lazy(_create_challenge_service)
 
 @game_router.get("/game/simulate")
-async def simulate_ai_guess(media_url: str = Query(...)):
+async def simulate_ai_guess(media_url: str = Query(...), challenge_service=Depends(get_challenge_service)) -> SimulatedGuessResponse:
     result = await challenge_service.get_ai_guess_for_media(media_url)
-    return {
-        "media_url": result["media_url"],
-        "ai_guess": result["ai_guess"],
-        "ai_confidence": result["ai_confidence"],
-        "difficulty": result["difficulty"],
-        "ai_reasoning": result["ai_reasoning"],
-    }
+    return SimulatedGuessResponse(
+        media_url=result["media_url"],
+        ai_guess=result["ai_guess"],
+        ai_confidence=result["ai_confidence"],
+        difficulty=result["difficulty"],
+        ai_reasoning=result["ai_reasoning"],
+    )
 
 @game_router.get("/game/difficulty")
-async def get_current_difficulty():
-    return {
-        "confidence_threshold": challenge_service.get_current_difficulty()
-    }
+async def get_current_difficulty(challenge_service=Depends(get_challenge_service)) -> DifficultyResponse:
+    return DifficultyResponse(confidence_threshold=await challenge_service.get_current_difficulty())
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from typing import Type, TypeVar
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+from controllers.competitor_controller import get_challenge_service, get_media_service
+from controllers.match_summary_controller import get_match_summary_service
+from controllers.scrape_controller import get_scrape_service
+from models.game_session import SessionError, StartSession, SubmitAnswer, client_message_adapter
+from services.game_session import GameSession
+from utils.logging_config import REQUEST_ID_HEADER, new_request_id, request_id_var
+from utils.metrics import current_endpoint
+
+logger = logging.getLogger(__name__)
+
+game_session_router = APIRouter(tags=["Game"])
+
+SESSION_PATH = "/game/session"
+
+# A session waiting this long for the player is closed
+IDLE_TIMEOUT_SECONDS = float(os.getenv("GAME_SESSION_IDLE_TIMEOUT", 300))
+
+M = TypeVar("M", bound=BaseModel)
+
+
+async def _send(websocket: WebSocket, message: BaseModel):
+    await websocket.send_text(message.model_dump_json())
+
+
+async def _receive(websocket: WebSocket, expected: Type[M]) -> M:
+    """Wait for the next client message of type ``expected``, reporting anything else."""
+    while True:
+        data = await asyncio.wait_for(websocket.receive_text(), IDLE_TIMEOUT_SECONDS)
+        try:
+            message = client_message_adapter.validate_json(data)
+        except ValidationError as e:
+            await _send(websocket, SessionError(detail=f"Invalid message: {e.errors()[0]['msg']}"))
+            continue
+        if isinstance(message, expected):
+            return message
+        await _send(websocket, SessionError(detail=f"Expected a '{expected.model_fields['type'].default}' message"))
+
+
+@game_session_router.websocket(SESSION_PATH)
+async def game_session(
+    websocket: WebSocket,
+    scrape_service=Depends(get_scrape_service),
+    media_service=Depends(get_media_service),
+    challenge_service=Depends(get_challenge_service),
+    match_summary_service=Depends(get_match_summary_service),
+):
+    """Play a whole match over one connection.
+
+    The client sends ``{"type": "start", "rounds": n}`` and then one
+    ``{"type": "answer", "answer": province}`` per ``round`` message. Each answer
+    is followed by a ``round_result`` with the AI's guess, and the match ends
+    with a ``summary``. The next rounds are scraped while the current one is played.
+    """
+    await websocket.accept()
+    request_token = request_id_var.set(new_request_id(websocket.headers.get(REQUEST_ID_HEADER)))
+    endpoint_token = current_endpoint.set(SESSION_PATH)
+    session = None
+    try:
+        start = await _receive(websocket, StartSession)
+        session = GameSession(scrape_service, media_service, challenge_service, match_summary_service, start.rounds)
+        logger.info("Game session started with %s rounds", start.rounds)
+
+        while session.round < session.total_rounds:
+            await _send(websocket, await session.start_round())
+            answer = await _receive(websocket, SubmitAnswer)
+            await _send(websocket, await session.submit_answer(answer.answer))
+
+        await _send(websocket, await session.summary())
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Game session disconnected after %s rounds", session.round if session else 0)
+    except asyncio.TimeoutError:
+        await _send(websocket, SessionError(detail="Session idle for too long"))
+        await websocket.close(code=1001)
+    except Exception as e:
+        logger.exception("Game session failed: %s", e)
+        await _send(websocket, SessionError(detail=f"Game session failed: {str(e)}"))
+        await websocket.close(code=1011)
+    finally:
+        if session:
+            await session.close()
+        current_endpoint.reset(endpoint_token)
+        request_id_var.reset(request_token)
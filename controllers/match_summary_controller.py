@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
-from services.match_summary_service import analyze_match_performance
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+from models.match_round import MatchRound, MatchSummaryResponse
+from utils.lazy import lazy_import
 
 match_summary_router = APIRouter()
 
+get_match_summary_service = lazy_import("services.match_summary_service")
+
 @match_summary_router.post("/match-summary")
-async def get_match_summary(rounds_data: List[Dict[str, Any]]):
+async def get_match_summary(rounds_data: List[MatchRound], match_summary_service=Depends(get_match_summary_service)) -> MatchSummaryResponse:
     try:
-        result = analyze_match_performance(rounds_data)
+        result = await match_summary_service.analyze_match_performance(rounds_data)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         
-        return result
+        return MatchSummaryResponse(**result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing match: {str(e)}")
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, HTTPException
-from services.scrape_service import ScrapeService
-from typing import Dict, Union
+from fastapi import APIRouter, Depends, HTTPException
+from models.cultural_media import CulturalMediaResponse
+from utils.lazy import Lazy
 
 scrape_router = APIRouter()
-scrape_service = ScrapeService()
+
+def _create_scrape_service():
+    from controllers.competitor_controller import get_challenge_service, get_media_service
+    from services.scrape_service import ScrapeService
+    # Shares the guess service so guesses precomputed at scrape time serve /game/guess,
+    # and the challenge service so they are made at the difficulty a round will use
+    return ScrapeService(media_service=get_media_service.get(), challenge_service=get_challenge_service.get())
+
+# Built on the first request so LangChain and BeautifulSoup stay out of startup
+get_scrape_service = Lazy(_create_scrape_service)
 
 @scrape_router.get("/scrape/cultural-media")
-async def scrape_cultural_media() -> Dict[str, Union[str, float]]:
-    """Scrape a valid cultural image. Auto-retries until confidence >= 0.75. Returns province, image_url, and confidence_score."""
+async def scrape_cultural_media(scrape_service=Depends(get_scrape_service)) -> CulturalMediaResponse:
+    """Scrape a valid cultural image or video. Auto-retries until confidence >= 0.75."""
     try:
-        result = scrape_service.scrape_until_valid()
-        return result
+        result = await scrape_service.scrape_until_valid()
+        return CulturalMediaResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
\ No newline at end of file
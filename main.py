@@ -1,16 +1,33 @@
 import os
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from controllers.scrape_controller import scrape_router
+from controllers.scrape_controller import get_scrape_service, scrape_router
 from controllers.competitor_controller import competitor_router
 from controllers.game_controller import game_router
+from controllers.game_session_controller import game_session_router
 from controllers.chatbot_controller import chatbot_router
 from controllers.match_summary_controller import match_summary_router
-import uvicorn
+from controllers.metrics_controller import metrics_router
+from utils.cache import flush_all
+from utils.metrics import REQUEST_DURATION, current_endpoint
+from utils.logging_config import REQUEST_ID_HEADER, configure_logging, new_request_id, request_id_var
+
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if get_scrape_service.loaded:
+        await get_scrape_service.get().aclose()
+    # Persisted caches write in the background; don't lose the last few seconds
+    flush_all()
 
 app = FastAPI(
     title="Culturate Garuda Hacks 6 AI",
-    description="Culturate AI API for Garuda Hacks 6"
+    description="Culturate AI API for Garuda Hacks 6",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -21,12 +38,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    token = current_endpoint.set(request.url.path)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label with the route template so path parameters don't explode cardinality
+        route = request.scope.get("route")
+        REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+        current_endpoint.reset(token)
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
+
 app.include_router(scrape_router)
 app.include_router(competitor_router)
 app.include_router(game_router)
+app.include_router(game_session_router)
 app.include_router(chatbot_router)
 app.include_router(match_summary_router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.environ.get("PORT", 8080))
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    # Workers share caches, difficulty and rate limits through services.shared_state
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    # Logging is configured above; stop uvicorn from installing its own handlers
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, log_config=None)
\ No newline at end of file
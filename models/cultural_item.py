@@ -18,3 +18,6 @@ class ChatRequest(BaseModel):
     cultural_item: Optional[CulturalItem] = None
     user_message: str
     chat_history: List[ChatTurn] = []
+
+class ChatResponse(BaseModel):
+    response: str
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+class CulturalMediaResponse(BaseModel):
+    province: str
+    media_type: Literal["image", "video"]
+    media_url: str
+    cultural_category: str
+    query: Optional[str] = None
+    cultural_fun_fact: Optional[str] = None
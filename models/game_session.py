@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Annotated, Literal, Optional, Union
+from models.cultural_media import CulturalMediaResponse
+
+# Client -> server
+
+class StartSession(BaseModel):
+    type: Literal["start"] = "start"
+    rounds: int = Field(5, ge=1, le=20)
+
+class SubmitAnswer(BaseModel):
+    type: Literal["answer"] = "answer"
+    answer: str
+
+ClientMessage = Annotated[Union[StartSession, SubmitAnswer], Field(discriminator="type")]
+client_message_adapter = TypeAdapter(ClientMessage)
+
+# Server -> client
+
+class RoundStarted(BaseModel):
+    type: Literal["round"] = "round"
+    round: int
+    total_rounds: int
+    item: CulturalMediaResponse
+
+class AIGuess(BaseModel):
+    ai_guess: str
+    ai_confidence: float
+    ai_correct: bool
+    ai_reasoning: Optional[str] = None
+    error: Optional[str] = None
+
+class RoundResult(BaseModel):
+    type: Literal["round_result"] = "round_result"
+    round: int
+    correct_answer: str
+    player_answer: str
+    player_correct: bool
+    ai: AIGuess
+    current_difficulty: float
+
+class SessionSummary(BaseModel):
+    type: Literal["summary"] = "summary"
+    rounds: int
+    player_score: int
+    ai_score: int
+    feedback: str
+
+class SessionError(BaseModel):
+    type: Literal["error"] = "error"
+    detail: str
@@ -1,6 +1,42 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class GuessRequest(BaseModel):
     input_url: str
     actual_province: Optional[str] = None
+
+class BatchGuessRequest(BaseModel):
+    items: List[GuessRequest] = Field(..., min_length=1, max_length=50)
+
+class GuessResponse(BaseModel):
+    actual_province: Optional[str] = None
+    ai_guess: str
+    ai_confidence: float
+    ai_correct: Optional[bool] = None
+    current_difficulty: float
+    ai_reasoning: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchGuessResult(BaseModel):
+    input_url: str
+    actual_province: Optional[str] = None
+    ai_guess: Optional[str] = None
+    ai_confidence: float = 0.0
+    ai_correct: Optional[bool] = None
+    ai_reasoning: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchGuessResponse(BaseModel):
+    difficulty: str
+    current_difficulty: float
+    results: List[BatchGuessResult]
+
+class SimulatedGuessResponse(BaseModel):
+    media_url: str
+    ai_guess: str
+    ai_confidence: float
+    difficulty: str
+    ai_reasoning: Optional[str] = None
+
+class DifficultyResponse(BaseModel):
+    confidence_threshold: float
@@ -5,4 +5,6 @@ class LocationGuessResult(BaseModel):
     province_guess: str
     confidence: float
     error: Optional[str] = None
-    reasoning: Optional[str] = None  
\ No newline at end of file
+    reasoning: Optional[str] = None
+    # Which inference path answered: fast, escalated, strong, keyframes or video
+    tier: Optional[str] = None  
\ No newline at end of file
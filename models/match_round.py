@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class CulturalData(BaseModel):
+    cultural_category: Optional[str] = None
+    cultural_context: Optional[str] = None
+
+class MatchRound(BaseModel):
+    # Field names follow the camelCase payload the game client sends
+    playerCorrect: bool = False
+    correctAnswer: Optional[str] = None
+    playerAnswer: Optional[str] = None
+    culturalData: Optional[CulturalData] = None
+
+class MatchSummaryResponse(BaseModel):
+    feedback: str
@@ -0,0 +1,95 @@
+"""
+Import-time report and budget check for the app's cold start.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter and prints
+the slowest top-level packages. It exits non-zero if importing ``main`` exceeds
+the budget, or if a heavy SDK that should load lazily is imported at startup.
+
+    python scripts/check_import_time.py --budget-ms 800 --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 800))
+
+# Heavy dependencies that must only load on the first use of a router
+LAZY_MODULES = [
+    "langchain",
+    "langchain_core",
+    "langchain_google_genai",
+    "google.generativeai",
+    "google.ai.generativelanguage_v1beta",
+    "googleapiclient",
+    "bs4",
+    "PIL",
+]
+
+
+def measure(module: str = "main") -> List[Tuple[str, int, int]]:
+    """Return ``(module, self_us, cumulative_us)`` for every import, in import order."""
+    env = dict(os.environ, GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "import-check"))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"importing {module} failed")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        imports.append((name, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def top_level_totals(imports: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Sum self time per top-level package."""
+    totals: Dict[str, int] = {}
+    for name, self_us, _ in imports:
+        package = name.split(".", 1)[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="maximum cumulative import time")
+    parser.add_argument("--top", type=int, default=10, help="number of packages to list")
+    args = parser.parse_args(argv)
+
+    imports = measure(args.module)
+    total_ms = next((cumulative for name, _, cumulative in imports if name == args.module), 0) / 1000
+
+    print(f"{'package':<32} {'self ms':>10}")
+    for package, self_us in sorted(top_level_totals(imports).items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<32} {self_us / 1000:>10.1f}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    imported = {name for name, _, _ in imports}
+    eager = [module for module in LAZY_MODULES if module in imported]
+    if eager:
+        print(f"FAIL: imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time exceeds budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,11 @@ from dotenv import load_dotenv
 
 from pydantic import SecretStr
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import BaseMessage
+from typing import List
+
+from services.gemini.rate_limiter import Priority, estimate_tokens
+from services.gemini.resilience import run_resilient
 
 import logging
 
@@ -11,6 +16,8 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 class BaseLangChainService:
+    # Scheduling class used for this service's calls in the shared rate limiter
+    priority = Priority.INTERACTIVE
 
     def __init__(
         self,
@@ -23,9 +30,23 @@ class BaseLangChainService:
             logger.error("Google API key not found in environment variables")
 
         logger.info(
-            f"Initializing BaseLangChainService with model: {model_name}"
+            "Initializing BaseLangChainService with model: %s", model_name
         )
 
         self.text_llm = ChatGoogleGenerativeAI(
             model=self.model_name, api_key=SecretStr(api_key), temperature=0.1
-        )
\ No newline at end of file
+        )
+
+    async def _ainvoke_text(self, messages: List[BaseMessage], images: int = 0):
+        """Invoke ``text_llm`` through the shared Gemini rate limiter, with deadline, retries and circuit breaker."""
+        prompt_text = "".join(
+            message.content if isinstance(message.content, str)
+            else "".join(part.get("text", "") for part in message.content if isinstance(part, dict))
+            for message in messages
+        )
+        return await run_resilient(
+            self.model_name,
+            lambda: self.text_llm.ainvoke(messages),
+            estimated_tokens=estimate_tokens(prompt_text, images=images),
+            priority=self.priority,
+        )
@@ -1,14 +1,33 @@
+import asyncio
 from services.cultural_media_location_service import CulturalMediaLocationService
+from services.shared_state import SharedState, get_shared_state
 from models.location_guess import LocationGuessResult
+from typing import List, Optional
+
+DIFFICULTY_STEP = 0.05
 
 class ChallengeService:
-    def __init__(self, initial_threshold: float = 0.5):
-        self.confidence_threshold = initial_threshold
+    """Tracks the AI's difficulty. The threshold lives in shared state so every worker agrees on it.
+
+    Shared backends do I/O, so reads and updates are async and run off the event
+    loop. Callers read the threshold once per round and pass it along.
+    """
+
+    THRESHOLD_KEY = "challenge:confidence_threshold"
+
+    def __init__(self, initial_threshold: float = 0.5, state: Optional[SharedState] = None):
+        self.initial_threshold = initial_threshold
+        self.state = state or get_shared_state()
         self.media_service = CulturalMediaLocationService()
 
+    async def _run(self, function, *args, **kwargs):
+        if self.state.shared:
+            return await asyncio.to_thread(function, *args, **kwargs)
+        return function(*args, **kwargs)
+
     async def get_ai_guess_for_media(self, media_url: str) -> dict:
         """Let AI guess based on the given media URL and current difficulty level."""
-        difficulty = self.map_threshold_to_difficulty()
+        difficulty = self.map_threshold_to_difficulty(await self.get_current_difficulty())
 
         result: LocationGuessResult = await self.media_service.predict_province_from_input(
             media_url=media_url,
@@ -24,17 +43,34 @@ class ChallengeService:
             "ai_reasoning": result.reasoning if hasattr(result, 'reasoning') else None
         }
 
-    def update_difficulty(self, ai_correct: bool):
-        if ai_correct:
-            self.confidence_threshold = min(1.0, self.confidence_threshold + 0.05)
+    async def update_difficulty(self, ai_correct: bool, threshold: float) -> float:
+        """Apply one round's outcome; ``threshold`` is the value read when the round
+        started. Returns the threshold after the round."""
+        return await self.update_difficulty_batch([ai_correct], threshold)
+
+    async def update_difficulty_batch(self, outcomes: List[bool], threshold: float) -> float:
+        """Apply the outcomes of several rounds in one pass."""
+        correct_count = sum(1 for ai_correct in outcomes if ai_correct)
+        if not correct_count:
+            return threshold
+        # Atomic across workers, so concurrent rounds never overwrite each other
+        return await self._run(
+            self.state.increment,
+            self.THRESHOLD_KEY,
+            DIFFICULTY_STEP * correct_count,
+            default=self.initial_threshold,
+            maximum=1.0,
+        )
 
-    def get_current_difficulty(self):
-        return self.confidence_threshold
+    async def get_current_difficulty(self) -> float:
+        threshold = await self._run(self.state.get, self.THRESHOLD_KEY)
+        return self.initial_threshold if threshold is None else threshold
 
-    def map_threshold_to_difficulty(self) -> str:
-        if self.confidence_threshold < 0.7:
+    @staticmethod
+    def map_threshold_to_difficulty(threshold: float) -> str:
+        if threshold < 0.7:
             return "easy"
-        elif self.confidence_threshold < 0.85:
+        elif threshold < 0.85:
             return "medium"
         else:
-            return "hard"
\ No newline at end of file
+            return "hard"
@@ -1,9 +1,11 @@
+import asyncio
+import base64
 import logging
 import json
 import os
 import re
 
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from dotenv import load_dotenv
 from google import generativeai as genai
@@ -11,30 +13,194 @@ from google.ai.generativelanguage_v1beta.types import Content, Part, FileData
 
 from services.gemini.base_service import BaseLangChainService
 from services.gemini.exceptions import GeminiServiceException
+from services.gemini.rate_limiter import background_priority, estimate_tokens
+from services.gemini.resilience import run_resilient
+from services.single_flight import SingleFlight
+from services.shared_state import get_shared_state
+from services.prompts import GUESS_REASONING_BY_DIFFICULTY, GUESS_REASONING_DEFAULT, render_prompt
+from utils.cache import TTLCache
+from utils.metrics import VIDEO_GUESS_TIERS, stage
 from models.location_guess import LocationGuessResult
-from utils.image_utils import read_url_as_base64
+from utils.image_utils import guess_image_mime_type, read_url_as_base64
+from utils.provinces import PROVINCES, canonical_province
+from utils.video_frames import keyframe_backend, sample_keyframes
+from services.youtube_service import extract_video_id, thumbnail_urls
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 logger = logging.getLogger(__name__)
 
+# Whole-video inference is much slower than image inference
+VIDEO_TIMEOUT_SECONDS = float(os.getenv("GEMINI_VIDEO_TIMEOUT_SECONDS", 120))
+
+# Shared across service instances so every router coalesces into the same calls
+_prediction_flights = SingleFlight("province_prediction")
+_media_fetch_flights = SingleFlight("media_fetch")
+_keyframe_flights = SingleFlight("video_keyframes")
+
+# Keyframes per video URL, so repeated guesses on one video skip download and decoding.
+# An empty list is cached too: that video falls back to whole-video inference.
+_keyframe_cache = TTLCache(
+    ttl_seconds=float(os.getenv("VIDEO_KEYFRAME_CACHE_TTL", 24 * 60 * 60)),
+    max_entries=int(os.getenv("VIDEO_KEYFRAME_CACHE_SIZE", 128)),
+    name="video_keyframes",
+)
+
+# Guesses computed ahead of time at scrape time, keyed by difficulty and media URL.
+# Kept in shared state when there is one, so every worker can serve them.
+_shared_state = get_shared_state()
+_precomputed_guesses = TTLCache(
+    ttl_seconds=float(os.getenv("PRECOMPUTED_GUESS_TTL", 6 * 60 * 60)),
+    max_entries=int(os.getenv("PRECOMPUTED_GUESS_CACHE_SIZE", 4096)),
+    name="precomputed_guesses",
+    state=_shared_state if _shared_state.shared else None,
+)
+
+# Image guesses run on a fast model without reasoning first. Hard rounds, and fast
+# guesses below GUESS_ESCALATE_CONFIDENCE, go to the multimodal model with reasoning.
+FAST_GUESS_MODEL = os.getenv("GUESS_FAST_MODEL", "models/gemini-2.0-flash")
+ESCALATE_CONFIDENCE = float(os.getenv("GUESS_ESCALATE_CONFIDENCE", 0.6))
+
+# A thumbnail guess at least this confident is answered without full-video inference
+THUMBNAIL_CONFIDENCE_THRESHOLD = float(os.getenv("VIDEO_THUMBNAIL_CONFIDENCE", 0.7))
+
+# Longest reasoning kept from a model response
+REASONING_MAX_CHARS = 300
+
+# Response schema for Gemini's JSON mode: the province is constrained to the game's list
+PROVINCE_GUESS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "province": {
+            "type": "string",
+            "format": "enum",
+            "enum": PROVINCES + ["Unknown"],
+        },
+        "confidence": {
+            "type": "number",
+            "description": "Confidence between 0.0 and 1.0",
+        },
+        "reasoning": {
+            "type": "string",
+            "description": "At most two short sentences",
+        },
+    },
+    "required": ["province", "confidence"],
+}
+
 
 class CulturalMediaLocationService(BaseLangChainService):
-    def __init__(self):
+    def __init__(
+        self,
+        structured_output: Optional[bool] = None,
+        video_keyframes: Optional[bool] = None,
+        thumbnail_first: Optional[bool] = None,
+        cascade: Optional[bool] = None,
+    ):
         super().__init__()
-        self.model = genai.GenerativeModel(model_name="models/gemini-2.5-flash")
+        self.video_model_name = "models/gemini-2.5-flash"
+        self.model = genai.GenerativeModel(model_name=self.video_model_name)
+        self.image_model = genai.GenerativeModel(model_name=self.multimodal_model_name)
+
+        if video_keyframes is None:
+            video_keyframes = os.getenv("VIDEO_KEYFRAMES", "true").lower() in ("1", "true", "yes")
+        self.video_keyframes = video_keyframes and keyframe_backend() is not None
+        if video_keyframes and not self.video_keyframes:
+            logger.info("Neither PyAV nor ffmpeg is available; direct video URLs are sent whole")
+
+        if thumbnail_first is None:
+            thumbnail_first = os.getenv("VIDEO_THUMBNAIL_FIRST", "true").lower() in ("1", "true", "yes")
+        self.thumbnail_first = thumbnail_first
+
+        if cascade is None:
+            cascade = os.getenv("GUESS_CASCADE", "true").lower() in ("1", "true", "yes")
+        self.cascade = cascade
+        self.fast_model_name = FAST_GUESS_MODEL
+        self.fast_image_model = genai.GenerativeModel(model_name=self.fast_model_name)
+
+        if structured_output is None:
+            structured_output = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+        self.structured_output = structured_output
+        self.structured_generation_config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=PROVINCE_GUESS_SCHEMA,
+            temperature=0.1,
+        )
+        self.structured_image_model = genai.GenerativeModel(
+            model_name=self.multimodal_model_name,
+            generation_config=self.structured_generation_config,
+        )
 
     async def predict_province_from_input(self, media_url: str, difficulty: str = "easy", use_chain_of_thought: bool = False) -> LocationGuessResult:
+        """Predict the province for ``media_url``, serving a precomputed guess when there is one.
+        Concurrent identical requests share one model call."""
+        precomputed = await _precomputed_guesses.aget(self._guess_key(media_url, difficulty, use_chain_of_thought))
+        if precomputed is not None:
+            return LocationGuessResult(**precomputed)
+
+        return await _prediction_flights.do(
+            (media_url, difficulty, use_chain_of_thought),
+            lambda: self._predict_province_from_input(media_url, difficulty, use_chain_of_thought)
+        )
+
+    async def precompute_guess(self, media_url: str, difficulty: str, use_chain_of_thought: bool = True):
+        """Guess ``media_url`` ahead of time and store the result for later lookups.
+
+        Runs at background priority so it never takes rate budget from players.
+        A live guess arriving meanwhile joins this call rather than repeating it.
+        """
+        try:
+            with background_priority():
+                result = await self.predict_province_from_input(media_url, difficulty, use_chain_of_thought)
+        except Exception as e:
+            logger.warning("Could not precompute %s guess for %s: %s", difficulty, media_url, e)
+            return
+        if not result.error:
+            await _precomputed_guesses.aset(self._guess_key(media_url, difficulty, use_chain_of_thought), result.model_dump())
+
+    @staticmethod
+    def _guess_key(media_url: str, difficulty: str, use_chain_of_thought: bool) -> str:
+        return f"{difficulty}:{int(use_chain_of_thought)}:{media_url}"
+
+    async def read_media_as_base64(self, media_url: str) -> str:
+        """Download ``media_url`` off the event loop. Concurrent downloads of one URL are coalesced."""
+        return await _media_fetch_flights.do(
+            media_url,
+            lambda: asyncio.to_thread(read_url_as_base64, media_url)
+        )
+
+    async def get_video_keyframes(self, video_url: str) -> List[bytes]:
+        """Sample keyframes of a direct video URL off the event loop, cached per URL."""
+        frames = _keyframe_cache.get(video_url)
+        if frames is not None:
+            return frames
+
+        async def sample():
+            with stage("keyframes"):
+                frames = await asyncio.to_thread(sample_keyframes, video_url)
+            _keyframe_cache.set(video_url, frames)
+            return frames
+
+        return await _keyframe_flights.do(video_url, sample)
+
+    async def _predict_province_from_input(self, media_url: str, difficulty: str, use_chain_of_thought: bool) -> LocationGuessResult:
         try:
             if self._is_video_or_youtube(media_url):
+                if self._is_youtube(media_url):
+                    return await self._predict_from_youtube(media_url, difficulty, use_chain_of_thought)
+                if self.video_keyframes:
+                    frames = await self.get_video_keyframes(media_url)
+                    if frames:
+                        return await self._predict_from_keyframes(frames, difficulty, use_chain_of_thought)
                 return await self._predict_from_video_url(media_url, difficulty, use_chain_of_thought)
             else:
-                image_base64 = read_url_as_base64(media_url)
+                with stage("fetch"):
+                    image_base64 = await self.read_media_as_base64(media_url)
                 return await self.predict_province_from_base64(image_base64, difficulty, use_chain_of_thought)
             
         except Exception as e:
-            logger.error(f"Prediction failed: {e}")
+            logger.error("Prediction failed: %s", e)
             return LocationGuessResult(
                 province_guess="Unknown",
                 confidence=0.0,
@@ -44,21 +210,92 @@ class CulturalMediaLocationService(BaseLangChainService):
     def _is_video_or_youtube(self, url: str) -> bool:
         return any(x in url.lower() for x in ["youtube.com", "youtu.be", ".mp4", ".mov", ".webm"])
 
+    def _is_youtube(self, url: str) -> bool:
+        return any(x in url.lower() for x in ["youtube.com", "youtu.be"])
+
+    async def _predict_from_youtube(self, url: str, difficulty: str, use_chain_of_thought: bool) -> LocationGuessResult:
+        """Guess from the video's thumbnail first, escalating to full-video inference when
+        the thumbnail guess is not confident enough or the difficulty is hard."""
+        video_id = extract_video_id(url)
+        if not self.thumbnail_first or not video_id or difficulty == "hard":
+            VIDEO_GUESS_TIERS.inc(tier="video")
+            return await self._predict_from_video_url(url, difficulty, use_chain_of_thought)
+
+        try:
+            with stage("guess_thumbnail"):
+                result = await self._predict_from_thumbnail(video_id, difficulty, use_chain_of_thought)
+        except Exception as e:
+            # The video model has its own breaker, so a thumbnail failure never ends the guess
+            logger.warning("Thumbnail guess for %s failed: %s", video_id, e)
+            result = None
+        if result is not None and not result.error and result.confidence >= THUMBNAIL_CONFIDENCE_THRESHOLD:
+            VIDEO_GUESS_TIERS.inc(tier="thumbnail")
+            return result
+
+        logger.info(
+            "Thumbnail guess for %s not confident enough (%s), using full video",
+            video_id, result.confidence if result else "unavailable",
+        )
+        VIDEO_GUESS_TIERS.inc(tier="escalated")
+        return await self._predict_from_video_url(url, difficulty, use_chain_of_thought)
+
+    async def _predict_from_thumbnail(self, video_id: str, difficulty: str, use_chain_of_thought: bool) -> Optional[LocationGuessResult]:
+        with stage("fetch"):
+            image_base64 = None
+            for thumbnail_url in thumbnail_urls(video_id):
+                try:
+                    image_base64 = await self.read_media_as_base64(thumbnail_url)
+                    break
+                except Exception as e:
+                    logger.debug("Thumbnail %s unavailable: %s", thumbnail_url, e)
+        if not image_base64:
+            return None
+        return await self.predict_province_from_base64(image_base64, difficulty, use_chain_of_thought)
+
+    async def _predict_from_keyframes(self, frames: List[bytes], difficulty: str, use_chain_of_thought: bool) -> LocationGuessResult:
+        """Guess from a few sampled frames sent as one multi-image prompt."""
+        with stage("build_prompt"):
+            prompt = self._build_cultural_origin_prompt(difficulty, use_chain_of_thought, structured=self.structured_output)
+            intro = render_prompt("guess.video_keyframes", frame_count=len(frames))
+            contents = [intro] + [{"mime_type": "image/jpeg", "data": frame} for frame in frames] + [prompt]
+        generation_config = self.structured_generation_config if self.structured_output else None
+
+        response = await run_resilient(
+            self.multimodal_model_name,
+            lambda: self.image_model.generate_content_async(contents, generation_config=generation_config),
+            estimated_tokens=estimate_tokens(intro + prompt, images=len(frames)),
+            priority=self.priority,
+        )
+        with stage("parse_output"):
+            result = self._parse_response(response.text)
+        result.tier = "keyframes"
+        return result
+
     async def _predict_from_video_url(self, url: str, difficulty: str, use_chain_of_thought: bool) -> LocationGuessResult:
-        prompt = self._build_cultural_origin_prompt(difficulty, use_chain_of_thought)
+        with stage("build_prompt"):
+            prompt = self._build_cultural_origin_prompt(difficulty, use_chain_of_thought, structured=self.structured_output)
+        generation_config = self.structured_generation_config if self.structured_output else None
 
         try:
-            response = self.model.generate_content(
-                contents=Content(parts=[
-                    Part(file_data=FileData(file_uri=url)),
-                    Part(text=prompt)
-                ])
+            contents = Content(parts=[
+                Part(file_data=FileData(file_uri=url)),
+                Part(text=prompt)
+            ])
+            response = await run_resilient(
+                self.video_model_name,
+                lambda: self.model.generate_content_async(contents=contents, generation_config=generation_config),
+                estimated_tokens=estimate_tokens(prompt, videos=1),
+                priority=self.priority,
+                timeout=VIDEO_TIMEOUT_SECONDS,
             )
 
-            return self._parse_response(response.text)
+            with stage("parse_output"):
+                result = self._parse_response(response.text)
+            result.tier = "video"
+            return result
 
         except Exception as e:
-            logger.error(f"Error in video prediction: {e}")
+            logger.error("Error in video prediction: %s", e)
             return LocationGuessResult(
                 province_guess="Unknown",
                 confidence=0.0,
@@ -77,15 +314,16 @@ class CulturalMediaLocationService(BaseLangChainService):
             )
 
         try:
-            prompt = self._build_cultural_origin_prompt(difficulty, use_chain_of_thought)
-
-            response_text = await self._invoke_multimodal_model(prompt, image_base64)
-            return self._parse_response(response_text)
+            if self.cascade:
+                return await self._predict_cascade(image_base64, difficulty, use_chain_of_thought)
+            result = await self._predict_strong(image_base64, difficulty, use_chain_of_thought)
+            result.tier = "strong"
+            return result
 
         except GeminiServiceException:
             raise
         except Exception as e:
-            logger.error(f"Error during province prediction: {e}")
+            logger.error("Error during province prediction: %s", e)
             return LocationGuessResult(
                 province_guess="Unknown",
                 confidence=0.0,
@@ -93,6 +331,74 @@ class CulturalMediaLocationService(BaseLangChainService):
             )
 
 
+    async def _predict_cascade(self, image_base64: str, difficulty: str, use_chain_of_thought: bool) -> LocationGuessResult:
+        """Answer easy and medium rounds from the fast stage when it is confident enough."""
+        tier = "strong"
+        if difficulty != "hard":
+            try:
+                # stage() counts the failure in STAGE_ERRORS
+                with stage("guess_fast"):
+                    result = await self._predict_fast(image_base64)
+            except Exception as e:
+                logger.warning("Fast guess failed, escalating: %s", e)
+                result = None
+            if result is not None and not result.error and result.confidence >= ESCALATE_CONFIDENCE:
+                result.tier = "fast"
+                return result
+            if result is not None:
+                logger.info("Fast guess confidence %s below %s, escalating", result.confidence, ESCALATE_CONFIDENCE)
+            tier = "escalated"
+
+        with stage("guess_strong"):
+            result = await self._predict_strong(image_base64, difficulty, use_chain_of_thought)
+        result.tier = tier
+        return result
+
+    async def _predict_fast(self, image_base64: str) -> LocationGuessResult:
+        """Single guess on the fast model, without chain-of-thought reasoning."""
+        with stage("build_prompt"):
+            prompt = self._build_cultural_origin_prompt(use_chain_of_thought=False, structured=self.structured_output)
+        contents = self._image_contents(prompt, image_base64)
+        generation_config = self.structured_generation_config if self.structured_output else None
+        response = await run_resilient(
+            self.fast_model_name,
+            lambda: self.fast_image_model.generate_content_async(contents, generation_config=generation_config),
+            estimated_tokens=estimate_tokens(prompt, images=1),
+            priority=self.priority,
+        )
+        with stage("parse_output"):
+            return self._parse_response(response.text)
+
+    async def _predict_strong(self, image_base64: str, difficulty: str, use_chain_of_thought: bool) -> LocationGuessResult:
+        with stage("build_prompt"):
+            prompt = self._build_cultural_origin_prompt(difficulty, use_chain_of_thought, structured=self.structured_output)
+
+        if self.structured_output:
+            response_text = await self._invoke_structured_image_model(prompt, image_base64)
+        else:
+            response_text = await self._invoke_multimodal_model(prompt, image_base64)
+        with stage("parse_output"):
+            return self._parse_response(response_text)
+
+    def _image_contents(self, prompt: str, image_base64: str) -> list:
+        with stage("encode"):
+            image_bytes = base64.b64decode(image_base64)
+            return [
+                {"mime_type": guess_image_mime_type(image_bytes), "data": image_bytes},
+                prompt,
+            ]
+
+    async def _invoke_structured_image_model(self, prompt: str, image_base64: str) -> str:
+        """Invoke the multimodal model in JSON mode with ``PROVINCE_GUESS_SCHEMA``."""
+        contents = self._image_contents(prompt, image_base64)
+        response = await run_resilient(
+            self.multimodal_model_name,
+            lambda: self.structured_image_model.generate_content_async(contents),
+            estimated_tokens=estimate_tokens(prompt, images=1),
+            priority=self.priority,
+        )
+        return response.text
+
     def _parse_response(self, response_text: str) -> LocationGuessResult:
         try:
             cleaned = response_text.strip()
@@ -101,53 +407,37 @@ class CulturalMediaLocationService(BaseLangChainService):
                 cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
                 cleaned = re.sub(r"\s*```$", "", cleaned)
 
-            logger.debug(f"Cleaned Gemini response:\n{cleaned}")
+            logger.debug("Cleaned Gemini response:\n%s", cleaned)
 
             data = json.loads(cleaned)
 
+            province = data.get("province") or "Unknown"
+            confidence = max(0.0, min(1.0, float(data.get("confidence", 0.0))))
+            reasoning = data.get("reasoning")
+            if reasoning and len(reasoning) > REASONING_MAX_CHARS:
+                reasoning = reasoning[:REASONING_MAX_CHARS].rstrip() + "..."
+
             return LocationGuessResult(
-                province_guess=data.get("province", "Unknown"),
-                confidence=float(data.get("confidence", 0.0)),
+                province_guess=canonical_province(province) or province,
+                confidence=confidence,
                 error=None,
-                reasoning=data.get("reasoning")
+                reasoning=reasoning
             )
         except Exception as e:
-            logger.error(f"Failed to parse Gemini response: {e}")
+            logger.error("Failed to parse Gemini response: %s", e)
             return LocationGuessResult(
                 province_guess="Unknown",
                 confidence=0.0,
                 error=str(e)
             )
 
-    def _build_cultural_origin_prompt(self, difficulty: str = "easy", use_chain_of_thought: bool = False) -> str:
-        base_instruction = "Kamu adalah pakar budaya Indonesia."
-
+    def _build_cultural_origin_prompt(self, difficulty: str = "easy", use_chain_of_thought: bool = False, structured: bool = False) -> str:
         # Optional chain of thought reasoning per difficulty level
         if use_chain_of_thought:
-            if difficulty == "easy":
-                reasoning = "Langsung tebak berdasarkan visual yang terlihat."
-            elif difficulty == "medium":
-                reasoning = "Jelaskan ciri-ciri visual terlebih dahulu seperti pakaian, bentuk bangunan, atau alat musik sebelum menebak."
-            elif difficulty == "hard":
-                reasoning = (
-                    "Analisis mendalam ciri-ciri visual budaya pada media ini. Bandingkan dengan budaya dari beberapa provinsi lain terlebih dahulu sebelum membuat kesimpulan."
-                )
-            else:
-                reasoning = "Langsung berikan tebakan."
+            reasoning = GUESS_REASONING_BY_DIFFICULTY.get(difficulty, GUESS_REASONING_DEFAULT)
         else:
             reasoning = ""
 
-        output_format = """
-        Berikan hasil sebagai objek JSON TANPA markdown code block, TANPA penjelasan tambahan, dan TANPA tanda ```json.
-
-        Jawab hanya dengan seperti ini:
-        {
-        "province": "Jawa Barat",
-        "confidence": 0.85,
-        "reasoning": "Berdasarkan pakaian tradisional yang terlihat, ini kemungkinan berasal dari Jawa Barat."
-        }
-
-        Jawab hanya dengan format JSON, tanpa penjelasan lain. 
-        Confidence harus bernilai antara 0.0 - 1.0 sesuai tingkat keyakinanmu."""
-
-        return f"{base_instruction}\n\n{reasoning}\n\n{output_format}"
+        # The structured variant relies on the response schema for the JSON shape and provinces
+        template = "guess.cultural_origin_structured" if structured else "guess.cultural_origin"
+        return render_prompt(template, reasoning=reasoning).rstrip()
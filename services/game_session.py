@@ -0,0 +1,131 @@
+"""
+State of one match played over a WebSocket.
+
+While a round is played the session is already scraping and validating the
+media of the rounds after it, and the AI's guess for the current item runs as
+soon as the item is shown. By the time the player answers, both the AI's
+answer and the next item are usually ready.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from models.game_session import AIGuess, RoundResult, RoundStarted, SessionSummary
+from models.location_guess import LocationGuessResult
+from models.match_round import CulturalData, MatchRound
+from utils.metrics import record_guess_result
+from utils.provinces import provinces_match
+
+logger = logging.getLogger(__name__)
+
+# Rounds scraped ahead of the one being played
+PREFETCH_DEPTH = int(os.getenv("GAME_SESSION_PREFETCH_DEPTH", 1))
+
+
+class GameSession:
+    def __init__(
+        self,
+        scrape_service,
+        media_service,
+        challenge_service,
+        match_summary_service,
+        total_rounds: int,
+        prefetch_depth: int = PREFETCH_DEPTH,
+    ):
+        self.scrape_service = scrape_service
+        self.media_service = media_service
+        self.challenge_service = challenge_service
+        self.match_summary_service = match_summary_service
+        self.total_rounds = total_rounds
+        self.prefetch_depth = prefetch_depth
+
+        self.round = 0
+        self.rounds: List[MatchRound] = []
+        self.ai_score = 0
+        self._scheduled = 0
+        self._prefetched: Deque[asyncio.Task] = deque()
+        self._item: Optional[Dict[str, Any]] = None
+        self._threshold: Optional[float] = None
+        self._difficulty: Optional[str] = None
+        self._ai_guess: Optional[asyncio.Task] = None
+
+    def _schedule(self):
+        self._prefetched.append(asyncio.create_task(self.scrape_service.scrape_until_valid()))
+        self._scheduled += 1
+
+    async def start_round(self) -> RoundStarted:
+        """Show the next item and start the AI guessing it in the background."""
+        if not self._prefetched:
+            self._schedule()
+        next_item = self._prefetched.popleft()
+        while len(self._prefetched) < self.prefetch_depth and self._scheduled < self.total_rounds:
+            self._schedule()
+        item = await next_item
+
+        self.round += 1
+        self._item = item
+        self._threshold = await self.challenge_service.get_current_difficulty()
+        self._difficulty = self.challenge_service.map_threshold_to_difficulty(self._threshold)
+        self._ai_guess = asyncio.create_task(self.media_service.predict_province_from_input(
+            media_url=item["media_url"],
+            difficulty=self._difficulty,
+            use_chain_of_thought=True,
+        ))
+        return RoundStarted(round=self.round, total_rounds=self.total_rounds, item=item)
+
+    async def submit_answer(self, answer: str) -> RoundResult:
+        item, self._item = self._item, None
+        ai_result: LocationGuessResult = await self._ai_guess
+        self._ai_guess = None
+
+        correct_answer = item["province"]
+        player_correct = provinces_match(answer, correct_answer)
+        ai_correct = provinces_match(ai_result.province_guess, correct_answer)
+        self._threshold = await self.challenge_service.update_difficulty(ai_correct, self._threshold)
+        record_guess_result(ai_result.tier, self._difficulty, ai_correct)
+        self.ai_score += ai_correct
+
+        self.rounds.append(MatchRound(
+            playerCorrect=player_correct,
+            correctAnswer=correct_answer,
+            playerAnswer=answer,
+            culturalData=CulturalData(
+                cultural_category=item.get("cultural_category"),
+                cultural_context=item.get("cultural_fun_fact"),
+            ),
+        ))
+        return RoundResult(
+            round=self.round,
+            correct_answer=correct_answer,
+            player_answer=answer,
+            player_correct=player_correct,
+            ai=AIGuess(
+                ai_guess=ai_result.province_guess,
+                ai_confidence=ai_result.confidence,
+                ai_correct=ai_correct,
+                ai_reasoning=ai_result.reasoning,
+                error=ai_result.error,
+            ),
+            current_difficulty=self._threshold,
+        )
+
+    async def summary(self) -> SessionSummary:
+        result = await self.match_summary_service.analyze_match_performance(self.rounds)
+        return SessionSummary(
+            rounds=len(self.rounds),
+            player_score=sum(round.playerCorrect for round in self.rounds),
+            ai_score=self.ai_score,
+            feedback=result["feedback"],
+        )
+
+    async def close(self):
+        """Cancel prefetches and guesses nobody will look at."""
+        pending = list(self._prefetched) + ([self._ai_guess] if self._ai_guess else [])
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._prefetched.clear()
+        self._ai_guess = None
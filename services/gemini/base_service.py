@@ -12,6 +12,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 
 from services.gemini.exceptions import GeminiAPIKeyMissingError, InvalidImageError
+from services.gemini.rate_limiter import Priority, estimate_tokens
+from services.gemini.resilience import run_resilient
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -20,6 +22,9 @@ logger = logging.getLogger(__name__)
 class BaseLangChainService:
     """Base service for Gemini services using LangChain."""
 
+    # Scheduling class used for this service's calls in the shared rate limiter
+    priority = Priority.INTERACTIVE
+
     def __init__(
         self,
         text_model_name: str = "models/gemini-1.5-pro",
@@ -44,10 +49,10 @@ class BaseLangChainService:
             raise GeminiAPIKeyMissingError()
 
         logger.info(
-            f"Initializing BaseLangChainService with text model: {text_model_name}"
+            "Initializing BaseLangChainService with text model: %s", text_model_name
         )
         logger.info(
-            f"Initializing BaseLangChainService with multimodal model: {multimodal_model_name}"
+            "Initializing BaseLangChainService with multimodal model: %s", multimodal_model_name
         )
 
         # Create text LLM
@@ -102,21 +107,22 @@ class BaseLangChainService:
             try:
                 base64.b64decode(b64_string)
             except binascii.Error as e:  # pragma: no cover
-                logger.error(f"Invalid base64 encoding: {str(e)}")
+                logger.error("Invalid base64 encoding: %s", e)
                 raise InvalidImageError(
                     "Generated invalid base64 string. Check image data."
                 )
 
-            logger.debug(
-                f"Successfully encoded image file to base64 (length: {len(b64_string)})"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Successfully encoded image file to base64 (length: %d)", len(b64_string)
+                )
             return b64_string
 
         except InvalidImageError as e:
             # Re-raise specific image errors
             raise e
         except Exception as e:
-            logger.error(f"Error in _read_image_bytes: {str(e)}")
+            logger.error("Error in _read_image_bytes: %s", e)
             raise InvalidImageError(f"Failed to process image: {str(e)}")
 
     async def _invoke_text_model(self, prompt: str) -> str:
@@ -129,13 +135,18 @@ class BaseLangChainService:
             The model's response as a string.
         """
         try:
-            logger.debug(f"Invoking text model with prompt: {prompt[:100]}...")
+            logger.debug("Invoking text model with prompt: %.100s...", prompt)
             human_message = HumanMessage(content=prompt)
-            response = await self.text_llm.ainvoke([human_message])
-            print(f"AI API Response (Text Model): {response.content[:500]}...")
+            response = await run_resilient(
+                self.text_model_name,
+                lambda: self.text_llm.ainvoke([human_message]),
+                estimated_tokens=estimate_tokens(prompt),
+                priority=self.priority,
+            )
+            logger.debug("Text model response: %.500s", response.content)
             return cast(str, response.content)
         except Exception as e:
-            logger.error(f"Error invoking text model: {str(e)}")
+            logger.error("Error invoking text model: %s", e)
             raise
 
     async def _invoke_multimodal_model(
@@ -152,7 +163,7 @@ class BaseLangChainService:
         """
         try:
             logger.debug(
-                f"Invoking multimodal model with prompt: {text_prompt[:100]}..."
+                "Invoking multimodal model with prompt: %.100s...", text_prompt
             )
 
             # Create multipart message with image and text
@@ -166,9 +177,14 @@ class BaseLangChainService:
                 ]
             )
 
-            response = await self.multimodal_llm.ainvoke([human_message])
-            print(f"AI API Response (Multimodal Model): {response.content[:500]}...")
+            response = await run_resilient(
+                self.multimodal_model_name,
+                lambda: self.multimodal_llm.ainvoke([human_message]),
+                estimated_tokens=estimate_tokens(text_prompt, images=1),
+                priority=self.priority,
+            )
+            logger.debug("Multimodal model response: %.500s", response.content)
             return cast(str, response.content)
         except Exception as e:
-            logger.error(f"Error invoking multimodal model: {str(e)}")
+            logger.error("Error invoking multimodal model: %s", e)
             raise
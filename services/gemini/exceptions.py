@@ -77,3 +77,34 @@ class InvalidImageError(GeminiServiceException):
             message: The error message.
         """
         super().__init__(message=message, status_code=400)
+
+
+class GeminiTimeoutError(GeminiServiceException):
+    """Exception raised when a Gemini call exceeds its deadline."""
+
+    def __init__(self, model_name: str, timeout: float):
+        """Initialize the exception.
+
+        Args:
+            model_name: The model that timed out.
+            timeout: The deadline in seconds.
+        """
+        super().__init__(
+            message=f"Gemini call to {model_name} timed out after {timeout:.1f}s",
+            status_code=504,
+        )
+
+
+class GeminiCircuitOpenError(GeminiServiceException):
+    """Exception raised when calls to a model are short-circuited after repeated failures."""
+
+    def __init__(self, model_name: str):
+        """Initialize the exception.
+
+        Args:
+            model_name: The model whose circuit breaker is open.
+        """
+        super().__init__(
+            message=f"Gemini model {model_name} is temporarily unavailable (circuit open)",
+            status_code=503,
+        )
@@ -0,0 +1,251 @@
+"""
+Rate limiting for Gemini API calls.
+
+Request and token budgets live in the shared state backend, so with several
+workers they are enforced across all of them. The concurrency cap is per process.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from services.shared_state import MemoryState, SharedState, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Rough conversion used to budget tokens before a call is made
+CHARS_PER_TOKEN = 4
+IMAGE_TOKEN_ESTIMATE = 258
+VIDEO_TOKEN_ESTIMATE = 30000
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 512
+
+
+class Priority(IntEnum):
+    """Scheduling class of a model call. Lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Calls are never scheduled ahead of this, whatever priority their service asks for
+priority_floor: ContextVar[Priority] = ContextVar("gemini_priority_floor", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """Schedule every model call made in this block, and in tasks it starts, as background work."""
+    token = priority_floor.set(Priority.BACKGROUND)
+    try:
+        yield
+    finally:
+        priority_floor.reset(token)
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    """Per-model request and token budgets."""
+
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+DEFAULT_MODEL_LIMITS: Dict[str, ModelLimits] = {
+    "gemini-1.5-pro": ModelLimits(requests_per_minute=1000, tokens_per_minute=4_000_000),
+    "gemini-2.0-flash": ModelLimits(requests_per_minute=2000, tokens_per_minute=4_000_000),
+    "gemini-2.5-flash": ModelLimits(requests_per_minute=1000, tokens_per_minute=1_000_000),
+    "gemini-2.5-pro": ModelLimits(requests_per_minute=150, tokens_per_minute=2_000_000),
+}
+FALLBACK_MODEL_LIMITS = ModelLimits(requests_per_minute=150, tokens_per_minute=1_000_000)
+
+
+def normalize_model_name(model_name: str) -> str:
+    return model_name.split("/", 1)[1] if model_name.startswith("models/") else model_name
+
+
+def estimate_tokens(
+    text: str = "",
+    images: int = 0,
+    videos: int = 0,
+    output_tokens: int = DEFAULT_OUTPUT_TOKEN_ESTIMATE,
+) -> int:
+    """Estimate the total tokens a call will consume, for budgeting purposes."""
+    return (
+        len(text) // CHARS_PER_TOKEN
+        + images * IMAGE_TOKEN_ESTIMATE
+        + videos * VIDEO_TOKEN_ESTIMATE
+        + output_tokens
+    )
+
+
+def parse_model_limits(spec: str) -> Dict[str, ModelLimits]:
+    """Parse ``model=rpm:tpm,model=rpm:tpm`` overrides, e.g. from ``GEMINI_RATE_LIMITS``."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            model_name, values = entry.split("=", 1)
+            rpm, tpm = values.split(":", 1)
+            limits[normalize_model_name(model_name.strip())] = ModelLimits(int(rpm), int(tpm))
+        except ValueError:
+            logger.warning("Ignoring malformed rate limit entry: %s", entry)
+    return limits
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``capacity`` per minute, kept in shared state."""
+
+    def __init__(self, capacity: float, state: SharedState, key: str):
+        self.capacity = capacity
+        self.refill_per_second = capacity / 60.0
+        self.state = state
+        self.key = key
+
+    def _take(self, amount: float, headroom: float) -> float:
+        return self.state.take_tokens(self.key, amount, self.capacity, self.refill_per_second, headroom)
+
+    async def try_take(self, amount: float, headroom: float = 0.0) -> float:
+        """Take ``amount`` while leaving ``headroom`` in the bucket; return 0, or the seconds to wait."""
+        if self.state.shared:
+            # Cross-process backends do I/O and may wait on a lock
+            return await asyncio.to_thread(self._take, amount, headroom)
+        return self._take(amount, headroom)
+
+    async def refund(self, amount: float):
+        await self.try_take(-amount)
+
+
+class PrioritySemaphore:
+    """Bounded semaphore that wakes waiters in priority order, FIFO within a class."""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int = Priority.INTERACTIVE):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; pass it on
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._value += 1
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+
+class GeminiRateLimiter:
+    """Coordinates every Gemini call in the process and, via shared state, across workers.
+
+    Each model gets a requests-per-minute and a tokens-per-minute bucket, and all
+    models share one concurrency semaphore. Background calls may only draw from a
+    bucket while ``background_headroom`` of its capacity stays free, and they queue
+    behind interactive calls for concurrency slots, so player-facing traffic
+    preempts scraping under load.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        model_limits: Optional[Dict[str, ModelLimits]] = None,
+        default_limits: ModelLimits = FALLBACK_MODEL_LIMITS,
+        background_headroom: float = 0.2,
+        state: Optional[SharedState] = None,
+    ):
+        self.state = state or MemoryState()
+        self.model_limits = dict(DEFAULT_MODEL_LIMITS, **(model_limits or {}))
+        self.default_limits = default_limits
+        self.background_headroom = background_headroom
+        self._semaphore = PrioritySemaphore(max_concurrency)
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+
+    def _buckets_for(self, model_name: str) -> Tuple[TokenBucket, TokenBucket]:
+        if model_name not in self._buckets:
+            limits = self.model_limits.get(model_name, self.default_limits)
+            self._buckets[model_name] = (
+                TokenBucket(limits.requests_per_minute, self.state, f"ratelimit:{model_name}:requests"),
+                TokenBucket(limits.tokens_per_minute, self.state, f"ratelimit:{model_name}:tokens"),
+            )
+        return self._buckets[model_name]
+
+    async def _reserve_budget(self, model_name: str, estimated_tokens: int, priority: Priority):
+        request_bucket, token_bucket = self._buckets_for(model_name)
+        tokens = min(estimated_tokens, token_bucket.capacity)
+        headroom = self.background_headroom if priority > Priority.INTERACTIVE else 0.0
+
+        while True:
+            wait = await request_bucket.try_take(1, headroom * request_bucket.capacity)
+            if wait <= 0:
+                wait = await token_bucket.try_take(tokens, headroom * token_bucket.capacity)
+                if wait <= 0:
+                    return
+                await request_bucket.refund(1)
+            logger.debug("Rate limit reached for %s, waiting %.2fs (priority %s)", model_name, wait, priority.name)
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        model_name: str,
+        estimated_tokens: int = DEFAULT_OUTPUT_TOKEN_ESTIMATE,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncIterator[None]:
+        model_name = normalize_model_name(model_name)
+        priority = max(priority, priority_floor.get())
+        await self._reserve_budget(model_name, estimated_tokens, priority)
+        await self._semaphore.acquire(priority)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+_rate_limiter: Optional[GeminiRateLimiter] = None
+
+
+def get_rate_limiter() -> GeminiRateLimiter:
+    """Return the process-wide limiter, configured from the environment on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = GeminiRateLimiter(
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", 8)),
+            model_limits=parse_model_limits(os.getenv("GEMINI_RATE_LIMITS", "")),
+            background_headroom=float(os.getenv("GEMINI_BACKGROUND_HEADROOM", 0.2)),
+            state=get_shared_state(),
+        )
+    return _rate_limiter
+
+
+async def run_limited(
+    model_name: str,
+    call: Callable[[], Awaitable[T]],
+    estimated_tokens: int = DEFAULT_OUTPUT_TOKEN_ESTIMATE,
+    priority: Priority = Priority.INTERACTIVE,
+) -> T:
+    """Run ``call`` once the shared limiter admits a request to ``model_name``."""
+    async with get_rate_limiter().acquire(model_name, estimated_tokens, priority):
+        return await call()
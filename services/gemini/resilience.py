@@ -0,0 +1,184 @@
+"""
+Deadlines, retries and circuit breaking for Gemini API calls.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from services.gemini.exceptions import GeminiCircuitOpenError, GeminiTimeoutError
+from services.gemini.rate_limiter import (
+    DEFAULT_OUTPUT_TOKEN_ESTIMATE,
+    Priority,
+    normalize_model_name,
+    run_limited,
+)
+from utils.metrics import MODEL_CALLS, MODEL_RETRIES, record_model_usage, stage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30))
+DEFAULT_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 2))
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 8.0
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "GatewayTimeout",
+    "BadGateway",
+}
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether ``error`` is transient: timeouts, throttling, 5xx and connection failures."""
+    if isinstance(error, (asyncio.TimeoutError, GeminiTimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    cause = error.__cause__
+    return cause is not None and cause is not error and is_retryable_error(cause)
+
+
+class CircuitBreaker:
+    """Per-model circuit breaker.
+
+    After ``failure_threshold`` consecutive transient failures the breaker opens and
+    rejects calls for ``recovery_timeout`` seconds. It then lets a single trial call
+    through (half-open); success closes it, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit opened after %s consecutive failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a half-open trial slot without recording an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    model_name = normalize_model_name(model_name)
+    with _circuit_breakers_lock:
+        if model_name not in _circuit_breakers:
+            _circuit_breakers[model_name] = CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", 5)),
+                recovery_timeout=float(os.getenv("GEMINI_BREAKER_RECOVERY_SECONDS", 30)),
+            )
+        return _circuit_breakers[model_name]
+
+
+async def run_resilient(
+    model_name: str,
+    call: Callable[[], Awaitable[T]],
+    estimated_tokens: int = DEFAULT_OUTPUT_TOKEN_ESTIMATE,
+    priority: Priority = Priority.INTERACTIVE,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+) -> T:
+    """Run a Gemini call with rate limiting, a per-attempt deadline, retries and a circuit breaker.
+
+    Raises:
+        GeminiCircuitOpenError: If the model's breaker is open, without calling the model.
+        GeminiTimeoutError: If the final attempt exceeds its deadline.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    breaker = get_circuit_breaker(model_name)
+    model_label = normalize_model_name(model_name)
+
+    for attempt in range(max_retries + 1):
+        if not breaker.allow_request():
+            MODEL_CALLS.inc(model=model_label, outcome="circuit_open")
+            raise GeminiCircuitOpenError(model_name)
+
+        try:
+            with stage("model_call"):
+                result = await run_limited(
+                    model_name,
+                    lambda: asyncio.wait_for(call(), timeout),
+                    estimated_tokens=estimated_tokens,
+                    priority=priority,
+                )
+            breaker.record_success()
+            MODEL_CALLS.inc(model=model_label, outcome="success")
+            record_model_usage(model_label, result)
+            return result
+        except asyncio.CancelledError:
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            if not is_retryable_error(e):
+                breaker.release_trial()
+                MODEL_CALLS.inc(model=model_label, outcome="error")
+                raise
+
+            breaker.record_failure()
+            error = GeminiTimeoutError(model_name, timeout) if isinstance(e, asyncio.TimeoutError) else e
+            MODEL_CALLS.inc(model=model_label, outcome="timeout" if error is not e else "retryable_error")
+            if attempt == max_retries:
+                if error is e:
+                    raise
+                raise error from e
+
+            delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.5)
+            logger.warning("Retryable error from %s (attempt %s/%s): %s; retrying in %.2fs", model_name, attempt + 1, max_retries + 1, error, delay)
+            MODEL_RETRIES.inc(model=model_label)
+            await asyncio.sleep(delay)
+
+    raise GeminiCircuitOpenError(model_name)  # pragma: no cover
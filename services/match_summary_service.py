@@ -1,63 +1,62 @@
 import os
 from typing import List, Dict, Any, Optional
+from models.match_round import MatchRound
 from dotenv import load_dotenv
 import google.generativeai as genai
+from services.gemini.rate_limiter import Priority, estimate_tokens
+from services.gemini.resilience import run_resilient
+from services.prompts import render_prompt
+from utils.metrics import stage
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel("gemini-2.0-flash")
+MODEL_NAME = "gemini-2.0-flash"
+model = genai.GenerativeModel(MODEL_NAME)
 
-def analyze_match_performance(rounds_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+async def analyze_match_performance(rounds_data: List[MatchRound]) -> Dict[str, Any]:
     if not rounds_data:
         return {
             "feedback": "No data available to analyze performance."
         }
     
-    feedback = generate_all_rounds_feedback(rounds_data)
+    feedback = await generate_all_rounds_feedback(rounds_data)
     
     return {
         "feedback": feedback
     }
 
-def generate_all_rounds_feedback(rounds_data: List[Dict[str, Any]]) -> str:
-    total_rounds = len(rounds_data)
-    correct_count = sum(1 for round in rounds_data if round.get("playerCorrect", False))
+async def generate_all_rounds_feedback(rounds_data: List[MatchRound]) -> str:
+    with stage("build_prompt"):
+        total_rounds = len(rounds_data)
+        correct_count = sum(1 for round in rounds_data if round.playerCorrect)
     
-    context = f"Complete Game Analysis ({total_rounds} rounds, {correct_count} correct):\n\n"
+        context = f"Complete Game Analysis ({total_rounds} rounds, {correct_count} correct):\n\n"
     
-    for i, round in enumerate(rounds_data, 1):
-        result = "✓ CORRECT" if round.get("playerCorrect", False) else "✗ WRONG"
-        province = round.get("correctAnswer", "Unknown")
-        player_guess = round.get("playerAnswer", "No answer")
-        category = round["culturalData"].get("cultural_category", "culture") if round.get("culturalData") else "culture"
-        cultural_context = round["culturalData"].get("cultural_context", "") if round.get("culturalData") else ""
+        for i, round in enumerate(rounds_data, 1):
+            result = "✓ CORRECT" if round.playerCorrect else "✗ WRONG"
+            province = round.correctAnswer or "Unknown"
+            player_guess = round.playerAnswer or "No answer"
+            cultural_data = round.culturalData
+            category = (cultural_data and cultural_data.cultural_category) or "culture"
+            cultural_context = (cultural_data and cultural_data.cultural_context) or ""
         
-        context += f"Round {i}: {result}\n"
-        context += f"  Province: {province}\n"
-        context += f"  Category: {category}\n"
-        context += f"  Your guess: {player_guess}\n"
-        if cultural_context:
-            context += f"  Context: {cultural_context[:80]}...\n"
-        context += "\n"
+            context += f"Round {i}: {result}\n"
+            context += f"  Province: {province}\n"
+            context += f"  Category: {category}\n"
+            context += f"  Your guess: {player_guess}\n"
+            if cultural_context:
+                context += f"  Context: {cultural_context[:80]}...\n"
+            context += "\n"
     
-    prompt = f"""
-    You are an Indonesian culture expert providing comprehensive feedback on a complete game session.
-
-    {context}
-
-    Provide feedback that:
-    1. Acknowledges their overall performance across ALL rounds
-    2. Identifies patterns in their correct/incorrect answers (which categories they're strong/weak in)
-    3. Includes 2-3 fascinating cultural fun facts about provinces they got wrong
-    4. Gives specific advice for improvement based on the categories they struggled with
-    5. Ends with encouragement
-
-    Keep it educational, engaging, and focused on Indonesian cultural learning. Maximum 5-6 sentences.
-    Make the fun facts memorable and tied to the specific provinces/categories they missed.
-    """
+        prompt = render_prompt("match_summary.feedback", context=context)
     
     try:
-        response = model.generate_content(prompt)
+        response = await run_resilient(
+            MODEL_NAME,
+            lambda: model.generate_content_async(prompt),
+            estimated_tokens=estimate_tokens(prompt),
+            priority=Priority.INTERACTIVE,
+        )
         return response.text.strip()
     except Exception as e:
         accuracy = (correct_count / total_rounds) * 100 if total_rounds > 0 else 0
@@ -0,0 +1,386 @@
+"""
+Registry of versioned prompt templates shared by the services.
+
+Templates are compiled once at import: incidental indentation and trailing
+whitespace are stripped, placeholders are parsed, and static token counts are
+estimated. Keeping each template's static text first and byte-stable lets the
+upstream API cache the prefix, and usage is tracked per template version.
+"""
+
+import inspect
+import logging
+import re
+import string
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+from services.gemini.rate_limiter import CHARS_PER_TOKEN
+from utils.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+def compile_text(text: str) -> str:
+    """Remove source indentation and trailing spaces, and collapse runs of blank lines."""
+    text = inspect.cleandoc(text)
+    text = "\n".join(line.rstrip() for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: str
+    template: str
+    fields: Tuple[str, ...] = field(default=())
+    static_prefix: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    @property
+    def static_tokens(self) -> int:
+        """Estimated tokens of the template text without any placeholder values."""
+        return count_tokens(self.template.format(**{name: "" for name in self.fields}))
+
+    @property
+    def prefix_tokens(self) -> int:
+        """Estimated tokens of the text before the first placeholder."""
+        return count_tokens(self.static_prefix)
+
+    def render(self, **values: Any) -> str:
+        missing = [name for name in self.fields if name not in values]
+        if missing:
+            raise KeyError(f"Prompt {self.key} is missing values for: {', '.join(missing)}")
+        return self.template.format(**values)
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, version: str, text: str) -> PromptTemplate:
+        template = compile_text(text)
+        parsed = list(string.Formatter().parse(template))
+        fields = tuple(dict.fromkeys(field_name for _, field_name, _, _ in parsed if field_name))
+
+        static_prefix = ""
+        for literal, field_name, _, _ in parsed:
+            static_prefix += literal
+            if field_name:
+                break
+
+        prompt = PromptTemplate(name, version, template, fields, static_prefix)
+        self._templates[name] = prompt
+        return prompt
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **values: Any) -> str:
+        """Render the current version of ``name`` and record its estimated token spend."""
+        prompt = self._templates[name]
+        text = prompt.render(**values)
+        self.record_usage(prompt.key, count_tokens(text))
+        return text
+
+    def record_usage(self, key: str, prompt_tokens: int):
+        with self._lock:
+            usage = self._usage.setdefault(key, {"renders": 0, "prompt_tokens": 0})
+            usage["renders"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {key: dict(usage) for key, usage in self._usage.items()}
+
+    def token_counts(self) -> Dict[str, Dict[str, int]]:
+        return {
+            prompt.key: {"static_tokens": prompt.static_tokens, "prefix_tokens": prompt.prefix_tokens}
+            for prompt in self._templates.values()
+        }
+
+
+prompt_registry = PromptRegistry()
+register = prompt_registry.register
+render_prompt = prompt_registry.render
+
+
+def _collect_prompt_metrics():
+    usage = prompt_registry.usage()
+    yield (
+        "culturate_prompt_renders_total",
+        "counter",
+        "Prompt renders per template version.",
+        [("culturate_prompt_renders_total", {"template": key}, value["renders"]) for key, value in usage.items()],
+    )
+    yield (
+        "culturate_prompt_tokens_estimated_total",
+        "counter",
+        "Estimated prompt tokens sent per template version.",
+        [("culturate_prompt_tokens_estimated_total", {"template": key}, value["prompt_tokens"]) for key, value in usage.items()],
+    )
+
+
+metrics_registry.register_collector(_collect_prompt_metrics)
+
+
+# ---------------------------------------------------------------------------
+# Scraping
+# ---------------------------------------------------------------------------
+
+register("scrape.query_generation", "v1", """
+    Generate a specific search query for finding {cultural_category} from {province} province in Indonesia.
+
+    The query should be:
+    - Concise (2-4 words)
+    - Include specific cultural element names when possible
+    - Use Indonesian terms when appropriate
+    - Focus on authentic traditional content
+
+    Examples:
+    - For "traditional dance" from "Jawa Barat": "tari jaipong"
+    - For "traditional music" from "Jawa Tengah": "gamelan jawa"
+    - For "traditional clothing" from "Bali": "pakaian adat bali"
+
+    Return ONLY the search query, nothing else.
+""")
+
+register("scrape.video_validation", "v1", """
+    Analyze this video information to determine if it accurately represents {cultural_category} from {province} province in Indonesia.
+
+    Video details:
+    - Title: {title}
+    - Description: {description}...
+    - Channel: {channel_title}{extra_details}
+
+    Search query used: "{query}"
+    Target province: {province}
+    Cultural category: {cultural_category}
+
+    Please evaluate:
+    1. Does the video appear to show authentic Indonesian cultural content?
+    2. Is it specifically related to {province} province?
+    3. Does it match the cultural category "{cultural_category}"?
+    4. Is the content quality and authenticity appropriate?
+
+    Return ONLY a confidence score between 0.0 and 1.0 as a number (e.g., 0.75).
+""")
+
+register("scrape.image_validation", "v1", """
+    Analyze this image to determine if it accurately represents {cultural_category} from {province} province in Indonesia.
+
+    Search query used: "{query}"
+    Target province: {province}
+    Cultural category: {cultural_category}
+
+    Please evaluate:
+    1. Does the image show authentic Indonesian cultural content?
+    2. Is it specifically related to {province} province?
+    3. Does it match the cultural category "{cultural_category}"?
+
+    Return ONLY a confidence score between 0.0 and 1.0 as a number (e.g., 0.75).
+""")
+
+register("scrape.image_validation_visual", "v1", """
+    Analyze this image to determine if it accurately represents {cultural_category} from {province} province in Indonesia.
+
+    Search query used: "{query}"
+    Target province: {province}
+    Cultural category: {cultural_category}
+
+    Please evaluate:
+    1. Does the image show authentic Indonesian cultural content?
+    2. Is it specifically related to {province} province?
+    3. Does it match the cultural category "{cultural_category}"?
+
+    Return ONLY a JSON object without markdown, in this format:
+    {{"confidence": 0.75, "detected_province": "Bali", "detected_category": "traditional dance"}}
+    confidence must be between 0.0 and 1.0.
+""")
+
+register("scrape.fun_fact_video", "v1", """
+    You are a cultural expert helping people learn about Indonesian heritage in a fun and engaging way.
+
+    Based on the following video information, write a **short, fun, and informative fact** about the most prominent cultural element mentioned or a general one based on the query if no specific element is found.
+    The fact should be written in 1–3 sentences, easy to read, and spark curiosity.
+
+    Rules:
+    1. If a specific cultural element (like "Tari Kecak", "Batik Jogja", "Wayang Kulit") is mentioned, write the fun fact about that.
+    2. If no specific cultural element is found, write a fun fact related to the broader cultural context of the query (e.g. the province or cultural category).
+    3. The fun fact must be written **without any intro or disclaimer** — do not say "since there is no specific element..." or anything like that.
+    4. The tone should be lively and curious, like trivia — not a formal explanation.
+    5. Keep it short and easy to read, max 3 sentences.
+
+    Examples:
+    - Good: "Tari Kecak is a Balinese dance where men chant in hypnotic rhythm — no instruments needed!"
+    - Good: "North Sumatra is home to the Batak people, known for their powerful vocal music and traditional houses."
+    - Bad: "Since the video is about a cultural festival, here's a general fact: ..."
+
+    Video Title: {title}
+    Video Description: {description}
+    Search Query: {query}
+
+    Now write the short fun fact:
+""")
+
+register("scrape.fun_fact_image", "v1", """
+    You are a cultural expert helping people learn about Indonesian heritage.
+
+    Based on the following Wikimedia Commons image filename and search query, write a short, fun, and educational fact about the most prominent cultural element mentioned.
+
+    Instructions:
+    1. Identify the cultural element (e.g., Tari Kecak, Gamelan Jawa, Batik Jogja, Rumah Gadang).
+    2. Write a fun fact about it in a friendly, concise tone — ideally 1–3 sentences.
+    3. Mention something interesting, like its origin, uniqueness, or when it’s used.
+    4. Use the traditional Indonesian name in your output.
+    5. If filename lacks clear cultural info, use the search query to guess a likely element and still generate a fact.
+    6. Do NOT return just the name — write a fun fact, not a label.
+
+    Examples:
+    - Filename: Tari_Kecak_performance.jpg → "Tari Kecak is a powerful Balinese dance where dozens of men chant 'cak cak cak' in unison — no instruments needed!"
+    - Filename: Batik_Jogja_traditional_pattern.png → "Batik Jogja is known for its symmetrical motifs and deep philosophy rooted in Javanese royalty."
+
+    Filename: {filename}
+    Search Query: {query}
+
+    Now write the short cultural fun fact:
+""")
+
+
+# ---------------------------------------------------------------------------
+# Province guessing
+# ---------------------------------------------------------------------------
+
+GUESS_REASONING_BY_DIFFICULTY = {
+    "easy": "Langsung tebak berdasarkan visual yang terlihat.",
+    "medium": "Jelaskan ciri-ciri visual terlebih dahulu seperti pakaian, bentuk bangunan, atau alat musik sebelum menebak.",
+    "hard": "Analisis mendalam ciri-ciri visual budaya pada media ini. Bandingkan dengan budaya dari beberapa provinsi lain terlebih dahulu sebelum membuat kesimpulan.",
+}
+GUESS_REASONING_DEFAULT = "Langsung berikan tebakan."
+
+register("guess.cultural_origin", "v1", """
+    Kamu adalah pakar budaya Indonesia.
+
+    Berikan hasil sebagai objek JSON TANPA markdown code block, TANPA penjelasan tambahan, dan TANPA tanda ```json.
+
+    Jawab hanya dengan seperti ini:
+    {{
+    "province": "Jawa Barat",
+    "confidence": 0.85,
+    "reasoning": "Berdasarkan pakaian tradisional yang terlihat, ini kemungkinan berasal dari Jawa Barat."
+    }}
+
+    Jawab hanya dengan format JSON, tanpa penjelasan lain.
+    Confidence harus bernilai antara 0.0 - 1.0 sesuai tingkat keyakinanmu.
+
+    {reasoning}
+""")
+
+register("guess.cultural_origin_structured", "v1", """
+    Kamu adalah pakar budaya Indonesia.
+
+    Tebak provinsi asal budaya pada media ini. Isi confidence antara 0.0 - 1.0 sesuai tingkat keyakinanmu, dan tulis reasoning singkat, maksimal 2 kalimat.
+
+    {reasoning}
+""")
+
+# Sent before the frames when a video is guessed from locally sampled keyframes
+register("guess.video_keyframes", "v1", """
+    {frame_count} gambar berikut adalah cuplikan adegan berurutan dari satu video yang sama. Anggap semuanya sebagai satu media.
+""")
+
+
+# ---------------------------------------------------------------------------
+# Chatbot
+# ---------------------------------------------------------------------------
+
+register("chatbot.greeting_home", "v1", """
+    You are a friendly and approachable cultural chatbot.
+    The user has just opened the homepage and has not selected any specific cultural item yet.
+    Your task is to greet the user in a short, warm, and casual way, and encourage them to ask something.
+
+    CRITICAL CONSTRAINTS:
+    - Maximum 2 sentences only
+    - No explanations, no examples, no elaboration
+    - Do NOT use Markdown formatting (*, **) or code blocks
+    - Be conversational but BRIEF
+
+    Example format:
+    Hi there! 👋 Ask me anything about Indonesian culture! 😊
+""")
+
+register("chatbot.greeting_item", "v1", """
+    You are a friendly cultural chatbot.
+
+    CRITICAL CONSTRAINTS:
+    - Maximum 2 sentences only
+    - Just greet and invite questions about this specific item
+    - No background info, no details, no explanations
+    - No bullet points, no Markdown formatting
+
+    The user just opened this cultural page:
+    Title: {title}
+    Type: {type}
+    Province: {province}
+    Description: {description}
+""")
+
+register("chatbot.conversation", "v1", """
+    You are a cultural chatbot assistant helping users understand Indonesian culture.
+
+    RESPONSE RULES (MANDATORY):
+    - Keep responses under 3 sentences maximum
+    - Answer directly without long introductions
+    - No repetitive explanations or unnecessary details
+    - If asked a simple question, give a simple answer
+    - No bullet points or lists unless specifically requested
+    - No Markdown formatting
+    - Be helpful but concise
+
+    {item_context}
+    {history}
+    User: {user_message}
+    Bot (respond in 1-3 sentences max):
+""")
+
+register("chatbot.item_context", "v1", """
+    The user is currently viewing:
+    Title: {title}
+    Type: {type}
+    Province: {province}
+    Description: {description}
+""")
+
+CHATBOT_NO_ITEM_CONTEXT = "The user has not selected any specific cultural item yet."
+
+
+# ---------------------------------------------------------------------------
+# Match summary
+# ---------------------------------------------------------------------------
+
+register("match_summary.feedback", "v1", """
+    You are an Indonesian culture expert providing comprehensive feedback on a complete game session.
+
+    Provide feedback that:
+    1. Acknowledges their overall performance across ALL rounds
+    2. Identifies patterns in their correct/incorrect answers (which categories they're strong/weak in)
+    3. Includes 2-3 fascinating cultural fun facts about provinces they got wrong
+    4. Gives specific advice for improvement based on the categories they struggled with
+    5. Ends with encouragement
+
+    Keep it educational, engaging, and focused on Indonesian cultural learning. Maximum 5-6 sentences.
+    Make the fun facts memorable and tied to the specific provinces/categories they missed.
+
+    {context}
+""")
+
+logger.debug("Compiled %s prompt templates", len(prompt_registry.token_counts()))
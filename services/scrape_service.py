@@ -1,7 +1,11 @@
 from .base_langchain import BaseLangChainService
 from .youtube_service import YouTubeService
+from .gemini.rate_limiter import Priority
+from .single_flight import SingleFlight
+from .prompts import render_prompt
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
 import random
 from langchain.schema import HumanMessage
 import time
@@ -10,29 +14,108 @@ from bs4 import BeautifulSoup
 import urllib.parse
 import os
 import re
+import json
+import base64
 from pathlib import Path
+from utils.cache import CACHE_DIR
+from utils.image_utils import downscale_image, guess_image_mime_type
+from utils.bucket_sampler import BucketSampler
+from utils.metrics import SCRAPE_ATTEMPTS, stage
+from utils.phash import ImageHashIndex, try_dhash
+from utils.provinces import PROVINCES, canonical_province, provinces_match
 
 logger = logging.getLogger(__name__)
 
+_query_flights = SingleFlight("query_generation")
+
+# Only this many bytes of a candidate are buffered when verifying in memory.
+IMAGE_PROBE_BYTES = 64 * 1024
+# Candidates advertising a larger body than this are rejected outright.
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Visual validation only needs a 512px copy, so it fetches a Wikimedia thumbnail
+# of this width and buffers at most VISUAL_MAX_BYTES of whatever it downloads.
+VISUAL_THUMBNAIL_WIDTH = int(os.getenv("SCRAPE_VISUAL_THUMBNAIL_WIDTH", 960))
+VISUAL_MAX_BYTES = int(os.getenv("SCRAPE_VISUAL_MAX_BYTES", 4 * 1024 * 1024))
+WIKIMEDIA_UPLOAD_PREFIX = "https://upload.wikimedia.org/wikipedia/commons/"
+THUMBNAIL_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+# Images whose dHashes differ in at most this many of 64 bits count as the same photo.
+DEDUPE_MAX_DISTANCE = int(os.getenv("SCRAPE_DEDUPE_MAX_DISTANCE", 8))
+MIN_VALID_CONFIDENCE = 0.75
+# Difficulties whose AI guesses are computed in the background for every scraped item.
+# "current" is the challenge's difficulty when the item is scraped, the one a round will ask for.
+CURRENT_DIFFICULTY = "current"
+PRECOMPUTE_DIFFICULTIES = [
+    difficulty.strip()
+    for difficulty in os.getenv("SCRAPE_PRECOMPUTE_DIFFICULTIES", CURRENT_DIFFICULTY).split(",")
+    if difficulty.strip()
+]
+# Share of province/category draws that stay uniform when the adaptive sampler is on
+SAMPLER_COVERAGE = float(os.getenv("SCRAPE_SAMPLER_COVERAGE", 0.1))
+
+def wikimedia_thumbnail_url(image_url: str, width: int = VISUAL_THUMBNAIL_WIDTH) -> Optional[str]:
+    """Thumbnail URL for an original Wikimedia Commons upload, or None for other URLs."""
+    if not image_url.startswith(WIKIMEDIA_UPLOAD_PREFIX) or "/thumb/" in image_url:
+        return None
+    path = image_url[len(WIKIMEDIA_UPLOAD_PREFIX):]
+    file_name = path.rsplit("/", 1)[-1]
+    if not file_name.lower().endswith(THUMBNAIL_EXTENSIONS):
+        return None
+    return f"{WIKIMEDIA_UPLOAD_PREFIX}thumb/{path}/{width}px-{file_name}"
+
+IMAGE_SIGNATURES = (
+    b"\xff\xd8\xff",       # JPEG
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"GIF87a", b"GIF89a",   # GIF
+    b"RIFF",                # WEBP (RIFF container)
+)
+
 class ScrapeService(BaseLangChainService):
-    def __init__(self):
+    priority = Priority.BACKGROUND
+
+    def __init__(
+        self,
+        persist_downloads: Optional[bool] = None,
+        visual_validation: Optional[bool] = None,
+        dedupe_images: Optional[bool] = None,
+        media_service=None,
+        challenge_service=None,
+        precompute_guesses: Optional[bool] = None,
+        adaptive_sampling: Optional[bool] = None,
+    ):
         super().__init__(model_name="models/gemini-2.0-flash")
         self.youtube_service = YouTubeService()
         logger.info("ScrapeService initialized")
         
+        if persist_downloads is None:
+            persist_downloads = os.getenv("SCRAPE_PERSIST_DOWNLOADS", "false").lower() in ("1", "true", "yes")
+        self.persist_downloads = persist_downloads
+        
+        if visual_validation is None:
+            visual_validation = os.getenv("SCRAPE_VISUAL_VALIDATION", "true").lower() in ("1", "true", "yes")
+        self.visual_validation = visual_validation
+        
+        if dedupe_images is None:
+            dedupe_images = os.getenv("SCRAPE_DEDUPE_IMAGES", "true").lower() in ("1", "true", "yes")
+        # Hashes of every image seen, with its verdict, so repeats skip the LLM
+        self.image_index = ImageHashIndex(
+            max_distance=DEDUPE_MAX_DISTANCE,
+            persist_path=CACHE_DIR / "image_hashes.json",
+            name="image_dedupe",
+        ) if dedupe_images else None
+        
+        if precompute_guesses is None:
+            precompute_guesses = os.getenv("SCRAPE_PRECOMPUTE_GUESSES", "true").lower() in ("1", "true", "yes")
+        # Guesses are made by the shared CulturalMediaLocationService, which stores them
+        self.media_service = media_service
+        self.challenge_service = challenge_service
+        self.precompute_guesses = precompute_guesses and media_service is not None
+        self._background_tasks: Set[asyncio.Task] = set()
+        
         self.download_dir = Path("downloads/cultural_images")
-        self.download_dir.mkdir(parents=True, exist_ok=True)
+        if self.persist_downloads:
+            self.download_dir.mkdir(parents=True, exist_ok=True)
         
-        self.provinces = [
-            "Aceh", "Sumatera Utara", "Sumatera Barat", "Riau", "Kepulauan Riau",
-            "Jambi", "Sumatera Selatan", "Kepulauan Bangka Belitung", "Bengkulu", "Lampung",
-            "DKI Jakarta", "Jawa Barat", "Banten", "Jawa Tengah", "DI Yogyakarta",
-            "Jawa Timur", "Bali", "Nusa Tenggara Barat", "Nusa Tenggara Timur",
-            "Kalimantan Barat", "Kalimantan Tengah", "Kalimantan Selatan", "Kalimantan Timur",
-            "Kalimantan Utara", "Sulawesi Utara", "Gorontalo", "Sulawesi Tengah",
-            "Sulawesi Selatan", "Sulawesi Barat", "Sulawesi Tenggara", "Maluku",
-            "Maluku Utara", "Papua"
-        ]
+        self.provinces = list(PROVINCES)
         
         self.cultural_categories = [
             "traditional dance", "traditional music", "traditional clothing",
@@ -46,35 +129,38 @@ class ScrapeService(BaseLangChainService):
             "cultural festival", "traditional ceremony"
         ]
         
+        self.max_video_duration_seconds = int(os.getenv("YOUTUBE_MAX_DURATION_SECONDS", 20 * 60))
+        
         self.media_probabilities = {
             "image": 0.6,
             "video": 0.4
         }
-
-    def generate_cultural_query(self, province: str, cultural_category: str) -> str:
-        
-        prompt = f"""Generate a specific search query for finding {cultural_category} from {province} province in Indonesia.
         
-        The query should be:
-        - Concise (2-4 words)
-        - Include specific cultural element names when possible
-        - Use Indonesian terms when appropriate
-        - Focus on authentic traditional content
+        if adaptive_sampling is None:
+            adaptive_sampling = os.getenv("SCRAPE_ADAPTIVE_SAMPLING", "true").lower() in ("1", "true", "yes")
+        # Learns which (province, media type, category) buckets yield valid media
+        self.sampler = BucketSampler(
+            coverage=SAMPLER_COVERAGE,
+            persist_path=CACHE_DIR / "scrape_sampler.json",
+        ) if adaptive_sampling else None
+
+    async def generate_cultural_query(self, province: str, cultural_category: str) -> str:
+        return await _query_flights.do(
+            (province, cultural_category),
+            lambda: self._generate_cultural_query(province, cultural_category)
+        )
+
+    async def _generate_cultural_query(self, province: str, cultural_category: str) -> str:
         
-        Examples:
-        - For "traditional dance" from "Jawa Barat": "tari jaipong"
-        - For "traditional music" from "Jawa Tengah": "gamelan jawa"
-        - For "traditional clothing" from "Bali": "pakaian adat bali"
-        
-        Return ONLY the search query, nothing else."""
+        prompt = render_prompt("scrape.query_generation", province=province, cultural_category=cultural_category)
         
         try:
-            response = self.text_llm.invoke([HumanMessage(content=prompt)])
+            response = await self._ainvoke_text([HumanMessage(content=prompt)])
             query = response.content.strip().replace('"', '').replace("'", "")
-            logger.info(f"Generated query for {province} {cultural_category}: {query}")
+            logger.info("Generated query for %s %s: %s", province, cultural_category, query)
             return query
         except Exception as e:
-            logger.error(f"Error generating query: {e}")
+            logger.error("Error generating query: %s", e)
             return f"{cultural_category} {province}".replace("traditional ", "")
 
     def choose_media_type(self) -> str:
@@ -84,31 +170,53 @@ class ScrapeService(BaseLangChainService):
         else:
             return "video"
 
-    def search_youtube_videos(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        return self.youtube_service.search_videos(query, max_results)
-
-    def validate_video_cultural_accuracy(self, video_data: Dict[str, Any], province: str, cultural_category: str, query: str) -> float:
-        try:
-            validation_prompt = f"""Analyze this video information to determine if it accurately represents {cultural_category} from {province} province in Indonesia.
-
-                Video details:
-                - Title: {video_data['title']}
-                - Description: {video_data['description'][:500]}...
-                - Channel: {video_data['channel_title']}
-
-                Search query used: "{query}"
-                Target province: {province}
-                Cultural category: {cultural_category}
+    def choose_province_and_category(self, media_type: str) -> Tuple[str, str]:
+        """Pick what to scrape next for ``media_type``, favouring buckets that have paid off."""
+        categories = self.video_cultural_categories if media_type == "video" else self.cultural_categories
+        if self.sampler is None:
+            return random.choice(self.provinces), random.choice(categories)
+        
+        _, province, cultural_category = self.sampler.choose([
+            (media_type, province, category) for province in self.provinces for category in categories
+        ])
+        return province, cultural_category
 
-                Please evaluate:
-                1. Does the video appear to show authentic Indonesian cultural content?
-                2. Is it specifically related to {province} province?
-                3. Does it match the cultural category "{cultural_category}"?
-                4. Is the content quality and authenticity appropriate?
+    async def search_youtube_videos(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        videos = await self.youtube_service.search_videos(query, max_results)
+        if not videos:
+            return videos
+        
+        videos = await self.youtube_service.enrich_videos(videos)
+        playable = [
+            video for video in videos
+            if self.youtube_service.is_playable(video, max_duration_seconds=self.max_video_duration_seconds)
+        ]
+        logger.info("%s/%s videos playable for query: %s", len(playable), len(videos), query)
+        return playable
 
-                Return ONLY a confidence score between 0.0 and 1.0 as a number (e.g., 0.75)."""
-            
-            response = self.text_llm.invoke([HumanMessage(content=validation_prompt)])
+    async def validate_video_cultural_accuracy(self, video_data: Dict[str, Any], province: str, cultural_category: str, query: str) -> float:
+        try:
+            extra_details = ""
+            if video_data.get('tags'):
+                extra_details += f"\n- Tags: {', '.join(video_data['tags'][:15])}"
+            if video_data.get('topic_categories'):
+                topics = [topic.rsplit('/', 1)[-1].replace('_', ' ') for topic in video_data['topic_categories']]
+                extra_details += f"\n- Topics: {', '.join(topics)}"
+            if video_data.get('duration_seconds'):
+                extra_details += f"\n- Duration: {video_data['duration_seconds']} seconds"
+            
+            validation_prompt = render_prompt(
+                "scrape.video_validation",
+                province=province,
+                cultural_category=cultural_category,
+                query=query,
+                title=video_data['title'],
+                description=video_data['description'][:1500],
+                channel_title=video_data['channel_title'],
+                extra_details=extra_details,
+            )
+            
+            response = await self._ainvoke_text([HumanMessage(content=validation_prompt)])
             response_text = response.content.strip()
             
             score_match = re.search(r'(\d+\.?\d*)', response_text)
@@ -118,19 +226,19 @@ class ScrapeService(BaseLangChainService):
                     confidence_score = 0
                 confidence_score = max(0.0, min(1.0, confidence_score))
             else:
-                logger.warning(f"Could not extract confidence score from: {response_text}")
+                logger.warning("Could not extract confidence score from: %s", response_text)
                 confidence_score = 0.0
             
-            logger.info(f"AI validation confidence for video {video_data['title']}: {confidence_score}")
+            logger.info("AI validation confidence for video %s: %s", video_data['title'], confidence_score)
             return confidence_score
                     
         except Exception as e:
-            logger.error(f"Error in video cultural validation: {e}")
+            logger.error("Error in video cultural validation: %s", e)
             title_desc = f"{video_data.get('title', '')} {video_data.get('description', '')}".lower()
             specific_terms = ['tari', 'dance', 'musik', 'music', 'pakaian', 'clothing', 'rumah', 'house', 'batik', 'wayang', 'indonesia', 'budaya', 'culture']
             matches = sum(1 for term in specific_terms if term in title_desc)
             confidence_score = min(0.9, max(0.3, matches * 0.15))
-            logger.info(f"Fallback video validation confidence: {confidence_score}")
+            logger.info("Fallback video validation confidence: %s", confidence_score)
             return confidence_score
 
     def search_wikimedia_commons(self, query: str, max_results: int = 5) -> List[str]:
@@ -139,7 +247,7 @@ class ScrapeService(BaseLangChainService):
             encoded_query = urllib.parse.quote_plus(query)
             search_url = f"https://commons.wikimedia.org/w/index.php?search={encoded_query}"
             
-            logger.info(f"Searching Wikimedia Commons: {search_url}")
+            logger.info("Searching Wikimedia Commons: %s", search_url)
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -163,7 +271,7 @@ class ScrapeService(BaseLangChainService):
                     if any(ext in filename for ext in image_extensions):
                         full_url = f"https://commons.wikimedia.org{href}"
                         if full_url not in file_urls:
-                            logger.info(f"Found image file: {href}")
+                            logger.info("Found image file: %s", href)
                             file_urls.append(full_url)
                             if len(file_urls) >= max_results:
                                 break
@@ -176,18 +284,18 @@ class ScrapeService(BaseLangChainService):
                         for match in file_matches:
                             file_url = f"https://commons.wikimedia.org/wiki/{match.replace(' ', '_')}"
                             if file_url not in file_urls:
-                                logger.info(f"Found image file from text: {match}")
+                                logger.info("Found image file from text: %s", match)
                                 file_urls.append(file_url)
                                 if len(file_urls) >= max_results:
                                     break
                         if len(file_urls) >= max_results:
                             break
             
-            logger.info(f"Found {len(file_urls)} image file URLs for query: {query}")
+            logger.info("Found %s image file URLs for query: %s", len(file_urls), query)
             return file_urls
             
         except Exception as e:
-            logger.error(f"Error searching Wikimedia Commons: {e}")
+            logger.error("Error searching Wikimedia Commons: %s", e)
             return []
 
     def extract_image_from_file_page(self, file_page_url: str) -> Optional[str]:
@@ -204,7 +312,7 @@ class ScrapeService(BaseLangChainService):
             
             image_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
             
-            logger.info(f"Extracting image from file page: {file_page_url}")
+            logger.info("Extracting image from file page: %s", file_page_url)
             
             file_page_img = soup.find('div', class_='fullImageLink')
             if file_page_img:
@@ -212,7 +320,7 @@ class ScrapeService(BaseLangChainService):
                 if link:
                     href = link['href']
                     if any(ext in href.lower() for ext in image_extensions):
-                        logger.info(f"Found main file image: {href}")
+                        logger.info("Found main file image: %s", href)
                         return href
             
             for link in soup.find_all('a', href=True):
@@ -221,7 +329,7 @@ class ScrapeService(BaseLangChainService):
                     'original' in link_text):
                     href = link['href']
                     if any(ext in href.lower() for ext in image_extensions):
-                        logger.info(f"Found original file link: {href}")
+                        logger.info("Found original file link: %s", href)
                         return href
             
             largest_thumb = None
@@ -248,7 +356,7 @@ class ScrapeService(BaseLangChainService):
                     if len(path_parts) >= 3:
                         original_path = '/'.join(path_parts[:-1])
                         original_url = f"https://upload.wikimedia.org/wikipedia/commons/{original_path}"
-                        logger.info(f"Converted largest thumbnail to original: {original_url}")
+                        logger.info("Converted largest thumbnail to original: %s", original_url)
                         return original_url
             
             for link in soup.find_all('a', href=True):
@@ -256,21 +364,91 @@ class ScrapeService(BaseLangChainService):
                 if ('upload.wikimedia.org' in href and 
                     any(ext in href.lower() for ext in image_extensions) and
                     '/thumb/' not in href):
-                    logger.info(f"Found direct upload link: {href}")
+                    logger.info("Found direct upload link: %s", href)
                     return href
             
-            logger.warning(f"Could not find image URL in {file_page_url}")
+            logger.warning("Could not find image URL in %s", file_page_url)
             return None
             
         except Exception as e:
-            logger.error(f"Error extracting image from {file_page_url}: {e}")
+            logger.error("Error extracting image from %s: %s", file_page_url, e)
             return None
 
+    def probe_image(self, image_url: str, max_bytes: int = IMAGE_PROBE_BYTES) -> Optional[bytes]:
+        """Verify an image URL in memory and return at most ``max_bytes`` of its body.
+
+        A HEAD request checks the MIME type and advertised size first, then a ranged
+        GET streams a bounded prefix into a buffer. Nothing is written to disk.
+        """
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        
+        try:
+            head = requests.head(image_url, headers=headers, timeout=10, allow_redirects=True)
+            if head.ok:
+                content_type = head.headers.get('content-type', '')
+                if content_type and not content_type.startswith('image/'):
+                    logger.warning("URL does not point to an image: %s", image_url)
+                    return None
+                
+                content_length = int(head.headers.get('content-length') or 0)
+                if content_length > MAX_IMAGE_BYTES:
+                    logger.warning("Image too large (%s bytes): %s", content_length, image_url)
+                    return None
+            
+            range_headers = dict(headers, Range=f"bytes=0-{max_bytes - 1}")
+            with requests.get(image_url, headers=range_headers, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    logger.warning("URL does not point to an image: %s", image_url)
+                    return None
+                
+                buffer = bytearray()
+                for chunk in response.iter_content(chunk_size=8192):
+                    buffer.extend(chunk)
+                    if len(buffer) >= max_bytes:
+                        break
+            
+            data = bytes(buffer[:max_bytes])
+            if not data.startswith(IMAGE_SIGNATURES):
+                logger.warning("Unrecognized image signature: %s", image_url)
+                return None
+            
+            logger.info("Verified image in memory (%s bytes buffered): %s", len(data), image_url)
+            return data
+            
+        except Exception as e:
+            logger.error("Error verifying image %s: %s", image_url, e)
+            return None
+
+    def fetch_image_for_validation(self, image_url: str) -> Optional[bytes]:
+        """Fetch a copy of ``image_url`` small enough for visual validation.
+
+        Wikimedia uploads are fetched as a thumbnail. Other URLs, and originals
+        too small to have a thumbnail of that width, fall back to a prefix of
+        the original, which is skipped if it exceeds ``VISUAL_MAX_BYTES``.
+        """
+        thumbnail_url = wikimedia_thumbnail_url(image_url)
+        if thumbnail_url:
+            image_bytes = self.probe_image(thumbnail_url, max_bytes=VISUAL_MAX_BYTES)
+            if image_bytes is not None:
+                return image_bytes
+        
+        image_bytes = self.probe_image(image_url, max_bytes=VISUAL_MAX_BYTES)
+        if image_bytes is not None and len(image_bytes) >= VISUAL_MAX_BYTES:
+            # A truncated original cannot be decoded reliably
+            logger.warning("Image larger than %s bytes and no thumbnail available: %s", VISUAL_MAX_BYTES, image_url)
+            return None
+        return image_bytes
+
     def download_image(self, image_url: str, province: str, query: str) -> Optional[str]:
         
         try:
             province_dir = self.download_dir / province.replace(" ", "_")
-            province_dir.mkdir(exist_ok=True)
+            province_dir.mkdir(parents=True, exist_ok=True)
    
             parsed_url = urllib.parse.urlparse(image_url)
             file_name = os.path.basename(parsed_url.path)
@@ -295,71 +473,49 @@ class ScrapeService(BaseLangChainService):
             
             content_type = response.headers.get('content-type', '')
             if not content_type.startswith('image/'):
-                logger.warning(f"URL does not point to an image: {image_url}")
+                logger.warning("URL does not point to an image: %s", image_url)
                 return None
             
             with open(local_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
             
-            logger.info(f"Downloaded image: {local_path}")
+            logger.info("Downloaded image: %s", local_path)
             return str(local_path)
             
         except Exception as e:
-            logger.error(f"Error downloading image from {image_url}: {e}")
+            logger.error("Error downloading image from %s: %s", image_url, e)
             return None
 
     def cleanup_local_file(self, local_path: str) -> bool:
         try:
             if local_path and os.path.exists(local_path):
                 os.remove(local_path)
-                logger.info(f"Cleaned up local file: {local_path}")
+                logger.info("Cleaned up local file: %s", local_path)
                 return True
             return False
         except Exception as e:
-            logger.error(f"Error cleaning up file {local_path}: {e}")
+            logger.error("Error cleaning up file %s: %s", local_path, e)
             return False
 
-    def generate_fun_fact_from_video(self, video_data: Dict[str, Any], query: str) -> str:
+    async def generate_fun_fact_from_video(self, video_data: Dict[str, Any], query: str) -> str:
         try:
             title = video_data.get('title', '')
             description = video_data.get('description', '')[:500] 
             
-            extraction_prompt = f"""You are a cultural expert helping people learn about Indonesian heritage in a fun and engaging way.
-
-                Based on the following video information, write a **short, fun, and informative fact** about the most prominent cultural element mentioned or a general one based on the query if no specific element is found. 
-                The fact should be written in 1–3 sentences, easy to read, and spark curiosity.
-
-                Video Title: {title}
-                Video Description: {description}
-                Search Query: {query}
+            extraction_prompt = render_prompt("scrape.fun_fact_video", title=title, description=description, query=query)
 
-                Rules:
-                1. If a specific cultural element (like "Tari Kecak", "Batik Jogja", "Wayang Kulit") is mentioned, write the fun fact about that.
-                2. If no specific cultural element is found, write a fun fact related to the broader cultural context of the query (e.g. the province or cultural category).
-                3. The fun fact must be written **without any intro or disclaimer** — do not say "since there is no specific element..." or anything like that.
-                4. The tone should be lively and curious, like trivia — not a formal explanation.
-                5. Keep it short and easy to read, max 3 sentences.
-
-                Examples:
-                - Good: "Tari Kecak is a Balinese dance where men chant in hypnotic rhythm — no instruments needed!"
-                - Good: "North Sumatra is home to the Batak people, known for their powerful vocal music and traditional houses."
-                - Bad: "Since the video is about a cultural festival, here's a general fact: ..."
-
-                Now write the short fun fact:
-                """
-
-            response = self.text_llm.invoke([HumanMessage(content=extraction_prompt)])
+            response = await self._ainvoke_text([HumanMessage(content=extraction_prompt)])
             fun_fact = response.content.strip().replace('"', '').replace("'", "")
             
-            logger.info(f"Generated cultural fun fact: {fun_fact}")
+            logger.info("Generated cultural fun fact: %s", fun_fact)
             return fun_fact if fun_fact else query
             
         except Exception as e:
-            logger.error(f"Error generating cultural fun fact from video: {e}")
+            logger.error("Error generating cultural fun fact from video: %s", e)
             return query
 
-    def generate_fun_fact_from_image(self, file_page_url: str, query: str) -> str:
+    async def generate_fun_fact_from_image(self, file_page_url: str, query: str) -> str:
         try:
             filename_match = re.search(r'/wiki/File:([^/]+)', file_page_url)
             filename = filename_match.group(1) if filename_match else ""
@@ -367,55 +523,24 @@ class ScrapeService(BaseLangChainService):
             filename = urllib.parse.unquote(filename)
             filename = filename.replace('_', ' ').replace('-', ' ')
             
-            extraction_prompt = f"""You are a cultural expert helping people learn about Indonesian heritage.
-
-                Based on the following Wikimedia Commons image filename and search query, write a short, fun, and educational fact about the most prominent cultural element mentioned.
-
-                Filename: {filename}
-                Search Query: {query}
+            extraction_prompt = render_prompt("scrape.fun_fact_image", filename=filename, query=query)
 
-                Instructions:
-                1. Identify the cultural element (e.g., Tari Kecak, Gamelan Jawa, Batik Jogja, Rumah Gadang).
-                2. Write a fun fact about it in a friendly, concise tone — ideally 1–3 sentences.
-                3. Mention something interesting, like its origin, uniqueness, or when it’s used.
-                4. Use the traditional Indonesian name in your output.
-                5. If filename lacks clear cultural info, use the search query to guess a likely element and still generate a fact.
-                6. Do NOT return just the name — write a fun fact, not a label.
-
-                Examples:
-                - Filename: Tari_Kecak_performance.jpg → "Tari Kecak is a powerful Balinese dance where dozens of men chant 'cak cak cak' in unison — no instruments needed!"
-                - Filename: Batik_Jogja_traditional_pattern.png → "Batik Jogja is known for its symmetrical motifs and deep philosophy rooted in Javanese royalty."
-
-                Now write the short cultural fun fact:
-                """
-
-            response = self.text_llm.invoke([HumanMessage(content=extraction_prompt)])
+            response = await self._ainvoke_text([HumanMessage(content=extraction_prompt)])
             fun_fact = response.content.strip().replace('"', '').replace("'", "")
 
-            logger.info(f"Generated cultural fun fact from image: {fun_fact}")
+            logger.info("Generated cultural fun fact from image: %s", fun_fact)
             return fun_fact if fun_fact else query
 
         except Exception as e:
-            logger.error(f"Error generating cultural fun fact from image: {e}")
+            logger.error("Error generating cultural fun fact from image: %s", e)
             return query
 
-    def validate_cultural_accuracy(self, province: str, cultural_category: str, query: str) -> float:
+    async def validate_cultural_accuracy(self, province: str, cultural_category: str, query: str) -> float:
         
         try:
-            validation_prompt = f"""Analyze this image to determine if it accurately represents {cultural_category} from {province} province in Indonesia.
-
-                    Search query used: "{query}"
-                    Target province: {province}
-                    Cultural category: {cultural_category}
-
-                    Please evaluate:
-                    1. Does the image show authentic Indonesian cultural content?
-                    2. Is it specifically related to {province} province?
-                    3. Does it match the cultural category "{cultural_category}"?
-
-                    Return ONLY a confidence score between 0.0 and 1.0 as a number (e.g., 0.75)."""
+            validation_prompt = render_prompt("scrape.image_validation", province=province, cultural_category=cultural_category, query=query)
             
-            response = self.text_llm.invoke([HumanMessage(content=validation_prompt)])
+            response = await self._ainvoke_text([HumanMessage(content=validation_prompt)])
             response_text = response.content.strip()
             
             score_match = re.search(r'(\d+\.?\d*)', response_text)
@@ -425,42 +550,97 @@ class ScrapeService(BaseLangChainService):
                     confidence_score = confidence_score / 100.0
                 confidence_score = max(0.0, min(1.0, confidence_score))
             else:
-                logger.warning(f"Could not extract confidence score from: {response_text}")
+                logger.warning("Could not extract confidence score from: %s", response_text)
                 confidence_score = 0.0
             
-            logger.info(f"AI validation confidence for {province}: {confidence_score}")
+            logger.info("AI validation confidence for %s: %s", province, confidence_score)
             return confidence_score
                     
         except Exception as e:
-            logger.error(f"Error in cultural validation: {e}")
+            logger.error("Error in cultural validation: %s", e)
             specific_terms = ['tari', 'dance', 'musik', 'music', 'pakaian', 'clothing', 'rumah', 'house', 'batik', 'wayang']
             is_specific = any(term in query.lower() for term in specific_terms)
             confidence_score = 0.75 if is_specific else 0.4
-            logger.info(f"Fallback validation confidence for {province}: {confidence_score}")
+            logger.info("Fallback validation confidence for %s: %s", province, confidence_score)
             return confidence_score
 
-    def scrape_validated_cultural_media(self) -> Dict[str, Any]:
-        province = random.choice(self.provinces)
+    async def validate_cultural_accuracy_visual(self, image_bytes: bytes, province: str, cultural_category: str, query: str) -> Dict[str, Any]:
+        """Validate the candidate image itself with the multimodal model.
+
+        Sends a downscaled copy of ``image_bytes`` and returns the confidence together
+        with the province and category the model detected, all from a single call.
+        Falls back to the text-only validator if the image cannot be analyzed.
+        """
+        try:
+            try:
+                image_bytes = downscale_image(image_bytes)
+            except Exception as e:
+                logger.warning("Could not downscale image, sending original: %s", e)
+            
+            image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+            mime_type = guess_image_mime_type(image_bytes)
+            
+            validation_prompt = render_prompt("scrape.image_validation_visual", province=province, cultural_category=cultural_category, query=query)
+            
+            message = HumanMessage(content=[
+                {"type": "text", "text": validation_prompt},
+                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{image_base64}"}},
+            ])
+            response = await self._ainvoke_text([message], images=1)
+            response_text = response.content.strip()
+            
+            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            if not json_match:
+                raise ValueError(f"No JSON object in response: {response_text[:200]}")
+            data = json.loads(json_match.group(0))
+            
+            confidence_score = float(data.get("confidence", 0.0))
+            if confidence_score > 1.0:
+                confidence_score = confidence_score / 100.0
+            confidence_score = max(0.0, min(1.0, confidence_score))
+            
+            detected_province = str(data.get("detected_province") or "Unknown")
+            detected_province = canonical_province(detected_province) or detected_province
+            detected_category = str(data.get("detected_category") or "Unknown")
+            
+            # The model recognised the content as belonging elsewhere
+            if not provinces_match(detected_province, province):
+                confidence_score = min(confidence_score, 0.5)
+            
+            logger.info("Visual validation for %s: confidence %s, detected %s / %s", province, confidence_score, detected_province, detected_category)
+            return {
+                "confidence": confidence_score,
+                "detected_province": detected_province,
+                "detected_category": detected_category,
+            }
+            
+        except Exception as e:
+            logger.error("Error in visual cultural validation: %s", e)
+            return {
+                "confidence": await self.validate_cultural_accuracy(province, cultural_category, query),
+                "detected_province": None,
+                "detected_category": None,
+            }
+
+    async def scrape_validated_cultural_media(self) -> Dict[str, Any]:
         media_type = self.choose_media_type()
+        province, cultural_category = self.choose_province_and_category(media_type)
         
-        if media_type == "video":
-            cultural_category = random.choice(self.video_cultural_categories)
-        else: 
-            cultural_category = random.choice(self.cultural_categories)
-        
-        logger.info(f"Starting pipeline for {cultural_category} from {province} (media type: {media_type})")
+        logger.info("Starting pipeline for %s from %s (media type: %s)", cultural_category, province, media_type)
         
+        started = time.perf_counter()
         try:
-            query = self.generate_cultural_query(province, cultural_category)
+            with stage("generate_query"):
+                query = await self.generate_cultural_query(province, cultural_category)
             
             if media_type == "image":
-                return self._scrape_image_media(province, cultural_category, query)
+                result = await self._scrape_image_media(province, cultural_category, query)
             else:  
-                return self._scrape_video_media(province, cultural_category, query)
+                result = await self._scrape_video_media(province, cultural_category, query)
             
         except Exception as e:
-            logger.error(f"Error in scraping pipeline: {e}")
-            return {
+            logger.error("Error in scraping pipeline: %s", e)
+            result = {
                 "province": province,
                 "cultural_category": cultural_category,
                 "media_type": media_type,
@@ -471,12 +651,19 @@ class ScrapeService(BaseLangChainService):
                 "local_path": None,
                 "confidence_score": 0.0
             }
-
-    def _scrape_image_media(self, province: str, cultural_category: str, query: str) -> Dict[str, Any]:
-        file_urls = self.search_wikimedia_commons(query, max_results=3)
+        
+        valid = self._is_valid(result)
+        SCRAPE_ATTEMPTS.inc(media_type=media_type, valid=str(valid).lower())
+        if self.sampler is not None:
+            self.sampler.record((media_type, province, cultural_category), valid, time.perf_counter() - started)
+        return result
+
+    async def _scrape_image_media(self, province: str, cultural_category: str, query: str) -> Dict[str, Any]:
+        with stage("search"):
+            file_urls = await asyncio.to_thread(self.search_wikimedia_commons, query, max_results=3)
         
         if not file_urls:
-            logger.warning(f"No image files found for query: {query}")
+            logger.warning("No image files found for query: %s", query)
             return {
                 "province": province,
                 "cultural_category": cultural_category,
@@ -489,18 +676,83 @@ class ScrapeService(BaseLangChainService):
             }
         
         for file_url in file_urls:
-            logger.info(f"Processing image file: {file_url}")
+            logger.info("Processing image file: %s", file_url)
             
-            image_url = self.extract_image_from_file_page(file_url)
-            if not image_url:
-                continue
-            
-            local_path = self.download_image(image_url, province, query)
-            if not local_path:
-                continue
+            with stage("fetch"):
+                image_url = await asyncio.to_thread(self.extract_image_from_file_page, file_url)
+                if not image_url:
+                    continue
+                
+                known = self.image_index.find_url(image_url) if self.image_index is not None else None
+                if known and known.get("served"):
+                    logger.info("Skipping image already served: %s", image_url)
+                    continue
+                
+                # Hashing and visual validation both need a decodable image, not a probe prefix
+                needs_image = self.visual_validation or self.image_index is not None
+                image_bytes = None
+                if self.persist_downloads:
+                    local_path = await asyncio.to_thread(self.download_image, image_url, province, query)
+                    if not local_path:
+                        continue
+                    if needs_image:
+                        image_bytes = await asyncio.to_thread(Path(local_path).read_bytes)
+                else:
+                    local_path = None
+                    if needs_image:
+                        image_bytes = await asyncio.to_thread(self.fetch_image_for_validation, image_url)
+                    else:
+                        image_bytes = await asyncio.to_thread(self.probe_image, image_url)
+                    if image_bytes is None:
+                        continue
+            
+            with stage("dedupe"):
+                image_hash = await asyncio.to_thread(try_dhash, image_bytes) if self.image_index is not None else None
+                match = self.image_index.find(image_hash) if image_hash is not None else None
+            if match:
+                distance, known = match
+                if known.get("served"):
+                    logger.info("Skipping near-duplicate (%s bits) of served image %s: %s", distance, known.get("url"), image_url)
+                    if local_path:
+                        await asyncio.to_thread(self.cleanup_local_file, local_path)
+                    continue
             
-            confidence_score = self.validate_cultural_accuracy(province, cultural_category, query)
-            cultural_fun_fact = self.generate_fun_fact_from_image(file_url, query)
+            if self._reusable_verdict(known, province, cultural_category):
+                logger.info("Reusing validation of known image %s for %s", known.get("url"), image_url)
+                if known["confidence"] < MIN_VALID_CONFIDENCE:
+                    if local_path:
+                        await asyncio.to_thread(self.cleanup_local_file, local_path)
+                    continue
+                confidence_score = known["confidence"]
+                detected_province = known.get("detected_province")
+                detected_category = known.get("detected_category")
+                cultural_fun_fact = known.get("cultural_fun_fact") or query
+            else:
+                detected_province = None
+                detected_category = None
+                with stage("validate"):
+                    if self.visual_validation and image_bytes:
+                        validation = await self.validate_cultural_accuracy_visual(image_bytes, province, cultural_category, query)
+                        confidence_score = validation["confidence"]
+                        detected_province = validation["detected_province"]
+                        detected_category = validation["detected_category"]
+                    else:
+                        confidence_score = await self.validate_cultural_accuracy(province, cultural_category, query)
+                with stage("fun_fact"):
+                    cultural_fun_fact = await self.generate_fun_fact_from_image(file_url, query)
+                
+                if image_hash is not None:
+                    await asyncio.to_thread(
+                        self.image_index.add,
+                        image_hash,
+                        url=image_url,
+                        province=province,
+                        cultural_category=cultural_category,
+                        confidence=confidence_score,
+                        detected_province=detected_province,
+                        detected_category=detected_category,
+                        cultural_fun_fact=cultural_fun_fact,
+                    )
             
             result = {
                 "province": province,
@@ -512,10 +764,13 @@ class ScrapeService(BaseLangChainService):
                 "media_url": image_url,
                 "local_path": local_path,
                 "confidence_score": confidence_score,
+                "detected_province": detected_province,
+                "detected_category": detected_category,
                 "cultural_fun_fact": cultural_fun_fact,
+                "image_hash": image_hash,
             }
             
-            logger.info(f"Image pipeline completed for {province}: confidence {confidence_score}, context: {cultural_fun_fact}")
+            logger.info("Image pipeline completed for %s: confidence %s, context: %s", province, confidence_score, cultural_fun_fact)
             return result
         
         return {
@@ -529,11 +784,12 @@ class ScrapeService(BaseLangChainService):
             "confidence_score": 0.0
         }
 
-    def _scrape_video_media(self, province: str, cultural_category: str, query: str) -> Dict[str, Any]:
-        videos = self.search_youtube_videos(query, max_results=3)
+    async def _scrape_video_media(self, province: str, cultural_category: str, query: str) -> Dict[str, Any]:
+        with stage("search"):
+            videos = await self.search_youtube_videos(query, max_results=3)
         
         if not videos:
-            logger.warning(f"No videos found for query: {query}")
+            logger.warning("No videos found for query: %s", query)
             return {
                 "province": province,
                 "cultural_category": cultural_category,
@@ -546,10 +802,12 @@ class ScrapeService(BaseLangChainService):
             }
         
         for video in videos:
-            logger.info(f"Processing video: {video['title']}")
+            logger.info("Processing video: %s", video['title'])
             
-            confidence_score = self.validate_video_cultural_accuracy(video, province, cultural_category, query)
-            cultural_fun_fact = self.generate_fun_fact_from_video(video, query)
+            with stage("validate"):
+                confidence_score = await self.validate_video_cultural_accuracy(video, province, cultural_category, query)
+            with stage("fun_fact"):
+                cultural_fun_fact = await self.generate_fun_fact_from_video(video, query)
             
             result = {
                 "province": province,
@@ -569,7 +827,7 @@ class ScrapeService(BaseLangChainService):
                 "cultural_fun_fact": cultural_fun_fact,
             }
             
-            logger.info(f"Video pipeline completed for {province}: confidence {confidence_score}, context: {cultural_fun_fact}")
+            logger.info("Video pipeline completed for %s: confidence %s, context: %s", province, confidence_score, cultural_fun_fact)
             return result
         
         return {
@@ -583,23 +841,67 @@ class ScrapeService(BaseLangChainService):
             "confidence_score": 0.0
         }
 
-    def scrape_until_valid(self, max_attempts: int = 10) -> Dict[str, Union[str, float]]:
+    async def aclose(self):
+        """Cancel pending guess precomputes and release pooled connections; called when the app shuts down."""
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        await self.youtube_service.aclose()
+
+    def schedule_guess_precompute(self, media_url: str):
+        """Start guessing ``media_url`` at every precomputed difficulty without waiting for it."""
+        if not self.precompute_guesses:
+            return
+        task = asyncio.create_task(self._precompute_guesses(media_url))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _precompute_guesses(self, media_url: str):
+        difficulties = set()
+        for difficulty in PRECOMPUTE_DIFFICULTIES:
+            if difficulty != CURRENT_DIFFICULTY:
+                difficulties.add(difficulty)
+            elif self.challenge_service is not None:
+                threshold = await self.challenge_service.get_current_difficulty()
+                difficulties.add(self.challenge_service.map_threshold_to_difficulty(threshold))
+        await asyncio.gather(*(self.media_service.precompute_guess(media_url, difficulty) for difficulty in difficulties))
+
+    @staticmethod
+    def _reusable_verdict(record: Optional[Dict[str, Any]], province: str, cultural_category: str) -> bool:
+        """Whether a known image was already validated for this province and category."""
+        return bool(
+            record
+            and record.get("confidence") is not None
+            and record.get("province") == province
+            and record.get("cultural_category") == cultural_category
+        )
+
+    @staticmethod
+    def _is_valid(result: Dict[str, Any]) -> bool:
+        return result.get("media_url") is not None and result.get("confidence_score", 0.0) >= MIN_VALID_CONFIDENCE
+
+    async def scrape_until_valid(self, max_attempts: int = 10) -> Dict[str, Union[str, float]]:
         for attempt in range(1, max_attempts + 1):
-            logger.info(f"Scraping attempt {attempt}/{max_attempts}")
+            logger.info("Scraping attempt %s/%s", attempt, max_attempts)
             
             try:
-                result = self.scrape_validated_cultural_media()
+                result = await self.scrape_validated_cultural_media()
                 
                 confidence_score = result.get("confidence_score", 0.0)
                 has_media = result.get("media_url") is not None
                 media_type = result.get("media_type", "unknown")
-                is_valid = confidence_score >= 0.75
+                is_valid = confidence_score >= MIN_VALID_CONFIDENCE
                 
                 if is_valid and has_media:
-                    logger.info(f"Found valid {media_type} on attempt {attempt}: {result['province']} (confidence: {confidence_score})")
+                    logger.info("Found valid %s on attempt %s: %s (confidence: %s)", media_type, attempt, result['province'], confidence_score)
+                    
+                    if result.get("image_hash") is not None:
+                        await asyncio.to_thread(self.image_index.add, result["image_hash"], served=True)
+                    
+                    self.schedule_guess_precompute(result["media_url"])
                     
                     if result.get("local_path"):
-                        self.cleanup_local_file(result["local_path"])
+                        await asyncio.to_thread(self.cleanup_local_file, result["local_path"])
                     
                     return_data = {
                         "province": result["province"],
@@ -612,18 +914,18 @@ class ScrapeService(BaseLangChainService):
                     
                     return return_data
                 else:
-                    logger.warning(f"Attempt {attempt} failed - Confidence: {confidence_score} (need ≥0.75), Has media: {has_media}, Media type: {media_type}")
+                    logger.warning("Attempt %s failed - Confidence: %s (need ≥0.75), Has media: %s, Media type: %s", attempt, confidence_score, has_media, media_type)
                     if result.get("local_path"):
-                        self.cleanup_local_file(result["local_path"])
+                        await asyncio.to_thread(self.cleanup_local_file, result["local_path"])
                     
-                    time.sleep(1)
+                    await asyncio.sleep(1)
                     continue
                     
             except Exception as e:
-                logger.error(f"Error on attempt {attempt}: {e}")
-                time.sleep(1)
+                logger.error("Error on attempt %s: %s", attempt, e)
+                await asyncio.sleep(1)
                 continue
         
-        logger.error(f"Failed to get valid media after {max_attempts} attempts")
+        logger.error("Failed to get valid media after %s attempts", max_attempts)
         raise Exception(f"Could not find valid cultural media after {max_attempts} attempts")
 
@@ -0,0 +1,435 @@
+"""
+State shared between worker processes: caches, difficulty and rate-limit buckets.
+
+Three backends implement the same small interface:
+
+- ``memory``: a dict in this process. This is the default for a single worker.
+- ``sqlite``: a WAL-mode SQLite file shared by all workers on one node. It is
+  the default when ``WEB_CONCURRENCY`` > 1.
+- ``redis``: any Redis-protocol server, for several nodes. It needs the
+  ``redis`` package.
+
+Select a backend with ``SHARED_STATE_BACKEND``. ``SHARED_STATE_PATH`` sets the
+SQLite file and ``SHARED_STATE_URL`` the Redis URL. Values are JSON-serializable.
+Read-modify-write operations (``increment``, ``increment_within``,
+``take_tokens``) are atomic across processes. Backends with ``shared`` set do
+blocking I/O, so async callers should run them with ``asyncio.to_thread``.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from utils.cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SQLITE_BUSY_TIMEOUT_SECONDS = 5.0
+# Expired rows are purged every this many writes
+SQLITE_PURGE_INTERVAL = 1000
+
+
+def refill_and_take(
+    tokens: float,
+    updated_at: float,
+    now: float,
+    amount: float,
+    capacity: float,
+    refill_per_second: float,
+    headroom: float,
+) -> Tuple[float, float]:
+    """Token-bucket step shared by the backends.
+
+    Returns ``(tokens, wait)``. ``wait`` is 0 when ``amount`` was taken, otherwise
+    the seconds until it could be taken while leaving ``headroom`` in the bucket.
+    A negative ``amount`` refunds tokens unconditionally.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_per_second)
+    if amount <= 0:
+        return min(capacity, tokens - amount), 0.0
+    deficit = amount + headroom - tokens
+    if deficit > 0:
+        return tokens, deficit / refill_per_second
+    return tokens - amount, 0.0
+
+
+def _clamp(value: float, minimum: Optional[float], maximum: Optional[float]) -> float:
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+
+class SharedState:
+    """Interface of the state backends."""
+
+    name = "base"
+    # Whether other worker processes see the same state
+    shared = False
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        """Iterate over live ``(key, value)`` pairs whose key starts with ``prefix``."""
+        raise NotImplementedError
+
+    def increment(
+        self,
+        key: str,
+        amount: float,
+        default: float = 0.0,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+        ttl: Optional[float] = None,
+    ) -> float:
+        """Atomically add ``amount`` to a number (``default`` if missing), clamp it and return it."""
+        raise NotImplementedError
+
+    def increment_within(self, key: str, amount: float, limit: float, ttl: Optional[float] = None) -> bool:
+        """Atomically add ``amount`` to a number (0 if missing) unless that would exceed ``limit``.
+        Returns whether it was added."""
+        raise NotImplementedError
+
+    def take_tokens(
+        self,
+        key: str,
+        amount: float,
+        capacity: float,
+        refill_per_second: float,
+        headroom: float = 0.0,
+    ) -> float:
+        """Atomically take from a token bucket; see ``refill_and_take``. Returns the wait in seconds."""
+        raise NotImplementedError
+
+
+class MemoryState(SharedState):
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, self._expiry(ttl))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            snapshot = [(key, self._live(key)) for key in keys]
+        for key, value in snapshot:
+            if value is not None:
+                yield key, value
+
+    def increment(self, key, amount, default=0.0, minimum=None, maximum=None, ttl=None) -> float:
+        with self._lock:
+            current = self._live(key)
+            value = _clamp((default if current is None else current) + amount, minimum, maximum)
+            self._data[key] = (value, self._expiry(ttl))
+            return value
+
+    def increment_within(self, key, amount, limit, ttl=None) -> bool:
+        with self._lock:
+            value = (self._live(key) or 0) + amount
+            if value > limit:
+                return False
+            self._data[key] = (value, self._expiry(ttl))
+            return True
+
+    def take_tokens(self, key, amount, capacity, refill_per_second, headroom=0.0) -> float:
+        with self._lock:
+            now = time.time()
+            tokens, updated_at = self._live(key) or (capacity, now)
+            tokens, wait = refill_and_take(tokens, updated_at, now, amount, capacity, refill_per_second, headroom)
+            self._data[key] = ((tokens, now), None)
+            return wait
+
+
+class SQLiteState(SharedState):
+    """Key-value table in a WAL-mode SQLite database, one connection per thread."""
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        # Take the write lock up front so read-modify-write cycles are atomic
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _read(connection: sqlite3.Connection, key: str, now: float) -> Optional[Any]:
+        row = connection.execute(
+            "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, now),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, connection: sqlite3.Connection, key: str, value: Any, ttl: Optional[float], now: float):
+        connection.execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl if ttl else None),
+        )
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_INTERVAL == 0:
+            connection.execute("DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._read(self._connection(), key, time.time())
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._transaction() as connection:
+            for key, value in values.items():
+                self._write(connection, key, value, ttl, now)
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        # Escape LIKE wildcards in the prefix
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self._connection().execute(
+            "SELECT key, value FROM shared_state WHERE key LIKE ? ESCAPE '\\' "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (pattern, time.time()),
+        ).fetchall()
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def increment(self, key, amount, default=0.0, minimum=None, maximum=None, ttl=None) -> float:
+        now = time.time()
+        with self._transaction() as connection:
+            current = self._read(connection, key, now)
+            value = _clamp((default if current is None else current) + amount, minimum, maximum)
+            self._write(connection, key, value, ttl, now)
+            return value
+
+    def increment_within(self, key, amount, limit, ttl=None) -> bool:
+        now = time.time()
+        with self._transaction() as connection:
+            value = (self._read(connection, key, now) or 0) + amount
+            if value > limit:
+                return False
+            self._write(connection, key, value, ttl, now)
+            return True
+
+    def take_tokens(self, key, amount, capacity, refill_per_second, headroom=0.0) -> float:
+        now = time.time()
+        with self._transaction() as connection:
+            tokens, updated_at = self._read(connection, key, now) or (capacity, now)
+            tokens, wait = refill_and_take(tokens, updated_at, now, amount, capacity, refill_per_second, headroom)
+            # Untouched for a full refill means the bucket is full again
+            self._write(connection, key, [tokens, now], math.ceil(capacity / refill_per_second) + 60, now)
+            return wait
+
+
+_REDIS_INCREMENT = """
+local value = tonumber(redis.call('GET', KEYS[1]) or ARGV[2]) + tonumber(ARGV[1])
+if ARGV[3] ~= '' then value = math.max(value, tonumber(ARGV[3])) end
+if ARGV[4] ~= '' then value = math.min(value, tonumber(ARGV[4])) end
+if tonumber(ARGV[5]) > 0 then
+    redis.call('SET', KEYS[1], tostring(value), 'PX', ARGV[5])
+else
+    redis.call('SET', KEYS[1], tostring(value))
+end
+return tostring(value)
+"""
+
+_REDIS_INCREMENT_WITHIN = """
+local value = tonumber(redis.call('GET', KEYS[1]) or '0') + tonumber(ARGV[1])
+if value > tonumber(ARGV[2]) then return 0 end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('SET', KEYS[1], tostring(value), 'PX', ARGV[3])
+else
+    redis.call('SET', KEYS[1], tostring(value))
+end
+return 1
+"""
+
+_REDIS_TAKE_TOKENS = """
+local amount = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local headroom = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(data[1]) or capacity
+local updated = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if amount <= 0 then
+    tokens = math.min(capacity, tokens - amount)
+elseif amount + headroom > tokens then
+    wait = (amount + headroom - tokens) / rate
+else
+    tokens = tokens - amount
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisState(SharedState):
+    """Redis-protocol backend; the atomic operations run as Lua scripts on the server."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, namespace: str = "culturate:"):
+        try:
+            import redis
+        except ImportError as e:  # pragma: no cover - depends on the deployment
+            raise RuntimeError("SHARED_STATE_BACKEND=redis requires the 'redis' package") from e
+
+        self.namespace = namespace
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._increment = self._client.register_script(_REDIS_INCREMENT)
+        self._increment_within = self._client.register_script(_REDIS_INCREMENT_WITHIN)
+        self._take_tokens = self._client.register_script(_REDIS_TAKE_TOKENS)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._client.get(self.namespace + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._client.set(self.namespace + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        with self._client.pipeline(transaction=False) as pipeline:
+            for key, value in values.items():
+                pipeline.set(self.namespace + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+            pipeline.execute()
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.namespace + key)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        keys = list(self._client.scan_iter(match=self.namespace + prefix + "*", count=500))
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            for key, value in zip(batch, self._client.mget(batch)):
+                if value is not None:
+                    yield key[len(self.namespace):], json.loads(value)
+
+    def increment(self, key, amount, default=0.0, minimum=None, maximum=None, ttl=None) -> float:
+        result = self._increment(
+            keys=[self.namespace + key],
+            args=[amount, default, "" if minimum is None else minimum, "" if maximum is None else maximum,
+                  int(ttl * 1000) if ttl else 0],
+        )
+        return float(result)
+
+    def increment_within(self, key, amount, limit, ttl=None) -> bool:
+        result = self._increment_within(
+            keys=[self.namespace + key],
+            args=[amount, limit, int(ttl * 1000) if ttl else 0],
+        )
+        return bool(int(result))
+
+    def take_tokens(self, key, amount, capacity, refill_per_second, headroom=0.0) -> float:
+        result = self._take_tokens(keys=[self.namespace + key], args=[amount, capacity, refill_per_second, headroom])
+        return float(result)
+
+
+def create_shared_state(backend: Optional[str] = None) -> SharedState:
+    """Build the backend named by ``backend`` or ``SHARED_STATE_BACKEND``."""
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    backend = (backend or os.getenv("SHARED_STATE_BACKEND") or ("sqlite" if workers > 1 else "memory")).lower()
+
+    if backend == "memory":
+        if workers > 1:
+            logger.warning("Shared state is per-process with %s workers; set SHARED_STATE_BACKEND=sqlite or redis", workers)
+        return MemoryState()
+    if backend == "sqlite":
+        return SQLiteState(os.getenv("SHARED_STATE_PATH", str(CACHE_DIR / "shared_state.db")))
+    if backend == "redis":
+        return RedisState(os.getenv("SHARED_STATE_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown SHARED_STATE_BACKEND: {backend}")
+
+
+_shared_state: Optional[SharedState] = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """Return the process-wide backend, configured from the environment on first use."""
+    global _shared_state
+    if _shared_state is None:
+        with _shared_state_lock:
+            if _shared_state is None:
+                _shared_state = create_shared_state()
+                logger.info("Using %s shared state backend", _shared_state.name)
+    return _shared_state
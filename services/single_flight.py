@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import weakref
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from utils.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single upstream call.
+
+    The first caller for a key starts the work as a task; callers arriving while it
+    is in flight await the same task and receive the same result or exception.
+    Once the task finishes the key is forgotten, so later calls start fresh work.
+    A caller being cancelled does not cancel the shared task for the others.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        _flights.add(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None and not task.done():
+            self.coalesced += 1
+            logger.debug("%s: joining in-flight call for %r", self.name, key)
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda finished: self._forget(key, finished))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+_flights: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+def _collect_single_flight_metrics():
+    flights = list(_flights)
+    yield (
+        "culturate_single_flight_calls_total",
+        "counter",
+        "Calls made through single-flight groups.",
+        [("culturate_single_flight_calls_total", {"flight": flight.name}, flight.calls) for flight in flights],
+    )
+    yield (
+        "culturate_single_flight_coalesced_total",
+        "counter",
+        "Calls that joined an in-flight upstream call instead of making their own.",
+        [("culturate_single_flight_coalesced_total", {"flight": flight.name}, flight.coalesced) for flight in flights],
+    )
+
+
+metrics_registry.register_collector(_collect_single_flight_metrics)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import random
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3/"
+
+# Static subset of the YouTube Data API v3 discovery document covering the
+# methods this project uses, so no discovery fetch is needed at startup.
+YOUTUBE_DISCOVERY = {
+    "search.list": {"httpMethod": "GET", "path": "search"},
+    "videos.list": {"httpMethod": "GET", "path": "videos"},
+}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class YouTubeAPIError(Exception):
+    """Raised when the YouTube Data API returns a non-retryable error or retries run out."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, reason: Optional[str] = None):
+        self.message = message
+        self.status_code = status_code
+        self.reason = reason
+        super().__init__(self.message)
+
+
+class AsyncYouTubeClient:
+    """Thin async client for the YouTube Data API built on a pooled ``httpx.AsyncClient``.
+
+    Construction performs no network I/O. Requests use per-call timeouts and are
+    retried with jittered exponential backoff on transport errors and 429/5xx.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=YOUTUBE_API_BASE_URL,
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def search(self, **params: Any) -> Dict[str, Any]:
+        return await self._call("search.list", params)
+
+    async def videos_list(self, **params: Any) -> Dict[str, Any]:
+        return await self._call("videos.list", params)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _call(self, method_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        method = YOUTUBE_DISCOVERY[method_id]
+        query = {key: value for key, value in params.items() if value is not None}
+        query["key"] = self.api_key
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await self._get_client().request(method["httpMethod"], method["path"], params=query)
+                if response.status_code < 400:
+                    return response.json()
+
+                reason = self._error_reason(response)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    raise YouTubeAPIError(
+                        f"{method_id} failed with HTTP {response.status_code}: {reason}",
+                        status_code=response.status_code,
+                        reason=reason,
+                    )
+                retry_after = response.headers.get("retry-after")
+                logger.warning("%s returned HTTP %s, retrying (attempt %s)", method_id, response.status_code, attempt + 1)
+
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise YouTubeAPIError(f"{method_id} failed: {e}") from e
+                logger.warning("%s transport error: %s, retrying (attempt %s)", method_id, e, attempt + 1)
+
+            delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+        raise YouTubeAPIError(f"{method_id} failed after {self.max_retries} retries")  # pragma: no cover
+
+    @staticmethod
+    def _error_reason(response: httpx.Response) -> str:
+        try:
+            error = response.json().get("error", {})
+            errors = error.get("errors") or [{}]
+            return errors[0].get("reason") or error.get("message") or response.text[:200]
+        except Exception:
+            return response.text[:200]
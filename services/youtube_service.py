@@ -1,13 +1,143 @@
+import asyncio
 import os
+import json
+import re
+import threading
+from datetime import datetime
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
 
+from utils.cache import CACHE_DIR, JsonFileWriter, TTLCache
+from services.shared_state import SharedState, get_shared_state
+from services.youtube_client import AsyncYouTubeClient
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:  # pragma: no cover - tzdata missing
+    QUOTA_TIMEZONE = None
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# YouTube Data API v3 quota costs, in units
+SEARCH_QUOTA_COST = 100
+VIDEOS_LIST_QUOTA_COST = 1
+
+# Shared quota counters outlive their day so late readers still see them
+QUOTA_STATE_TTL = 2 * 24 * 60 * 60
+
+# videos().list accepts at most this many ids per call
+VIDEOS_LIST_BATCH_SIZE = 50
+
+ISO_DURATION_PATTERN = re.compile(
+    r"P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?"
+)
+
+def parse_iso_duration(duration: str) -> Optional[int]:
+    """Convert an ISO 8601 duration such as ``PT4M13S`` to seconds."""
+    match = ISO_DURATION_PATTERN.fullmatch(duration or "")
+    if not match:
+        return None
+    parts = {name: int(value) for name, value in match.groupdict().items() if value}
+    return (
+        parts.get("days", 0) * 86400
+        + parts.get("hours", 0) * 3600
+        + parts.get("minutes", 0) * 60
+        + parts.get("seconds", 0)
+    )
+
+YOUTUBE_ID_PATTERN = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/)|youtu\.be/)([A-Za-z0-9_-]{11})")
+
+# Largest first; maxresdefault only exists for HD uploads, hqdefault always does
+THUMBNAIL_NAMES = ("maxresdefault", "sddefault", "hqdefault")
+
+def extract_video_id(url: str) -> Optional[str]:
+    match = YOUTUBE_ID_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+def thumbnail_urls(video_id: str) -> List[str]:
+    return [f"https://i.ytimg.com/vi/{video_id}/{name}.jpg" for name in THUMBNAIL_NAMES]
+
+class YouTubeQuotaTracker:
+    """Tracks YouTube Data API quota units spent per day.
+
+    The API quota resets at midnight Pacific time, so days are counted in that
+    timezone. Usage is persisted so restarts do not forget what was spent.
+    ``reserve`` units are held back so the service stops before the hard limit.
+    With a shared ``state`` the daily counter is kept there, so all workers draw
+    on one budget instead of each spending the full quota. ``try_spend`` checks
+    and spends in one atomic step, so concurrent workers cannot overshoot.
+    """
+
+    def __init__(
+        self,
+        daily_limit: int,
+        reserve: int = 0,
+        persist_path: Optional[str] = None,
+        state: Optional[SharedState] = None,
+    ):
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self.persist_path = persist_path
+        self.state = state
+        self._lock = threading.Lock()
+        self._day = self._today()
+        self._used = 0
+        self._writer = JsonFileWriter(persist_path, self._snapshot) if persist_path and state is None else None
+        if state is None:
+            self._load()
+
+    def _today(self) -> str:
+        return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+
+    def _state_key(self) -> str:
+        return f"youtube:quota:{self._today()}"
+
+    async def try_spend(self, units: int) -> bool:
+        """Spend ``units`` unless that would cut into the reserve; returns whether it did."""
+        limit = self.daily_limit - self.reserve
+        if self.state is not None:
+            return await asyncio.to_thread(self.state.increment_within, self._state_key(), units, limit, QUOTA_STATE_TTL)
+        with self._lock:
+            self._roll_over()
+            if self._used + units > limit:
+                return False
+            self._used += units
+        if self._writer is not None:
+            self._writer.mark_dirty()
+        return True
+
+    async def used_today(self) -> int:
+        if self.state is not None:
+            return int(await asyncio.to_thread(self.state.get, self._state_key()) or 0)
+        with self._lock:
+            self._roll_over()
+            return self._used
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("day") == self._day:
+                self._used = int(data.get("used", 0))
+        except Exception as e:
+            logger.warning("Could not load YouTube quota usage: %s", e)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"day": self._day, "used": self._used}
+
 class YouTubeService:
     def __init__(self):
         api_key = os.getenv("GOOGLE_API_KEY")
@@ -15,32 +145,66 @@ class YouTubeService:
             logger.error("Google API key not found in environment variables")
             raise ValueError("Google API key is required for YouTube service")
 
-        try:
-            self.youtube_client = build('youtube', 'v3', developerKey=api_key)
-            logger.info("YouTube API client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize YouTube API client: {e}")
-            self.youtube_client = None
-            raise
+        # Across workers the caches and quota live in shared state, otherwise in local files
+        shared_state = get_shared_state()
+        state = shared_state if shared_state.shared else None
+
+        self.search_cache = TTLCache(
+            ttl_seconds=float(os.getenv("YOUTUBE_SEARCH_CACHE_TTL", 24 * 60 * 60)),
+            max_entries=2048,
+            persist_path=CACHE_DIR / "youtube_search.json",
+            name="youtube_search",
+            state=state,
+        )
+        self.details_cache = TTLCache(
+            ttl_seconds=float(os.getenv("YOUTUBE_DETAILS_CACHE_TTL", 7 * 24 * 60 * 60)),
+            max_entries=8192,
+            persist_path=CACHE_DIR / "youtube_videos.json",
+            name="youtube_video_details",
+            state=state,
+        )
+        self.quota = YouTubeQuotaTracker(
+            daily_limit=int(os.getenv("YOUTUBE_DAILY_QUOTA", 10000)),
+            reserve=int(os.getenv("YOUTUBE_QUOTA_RESERVE", 500)),
+            persist_path=str(CACHE_DIR / "youtube_quota.json"),
+            state=state,
+        )
+
+        self.youtube_client = AsyncYouTubeClient(
+            api_key,
+            timeout=float(os.getenv("YOUTUBE_API_TIMEOUT", 10)),
+            max_retries=int(os.getenv("YOUTUBE_API_MAX_RETRIES", 3)),
+        )
+        logger.info("YouTube API client initialized successfully")
+
+    async def search_videos(self, query: str, max_results: int = 5, region_code: str = 'ID', relevance_language: str = 'id') -> List[Dict[str, Any]]:
+        cache_key = f"{query.strip().lower()}|{max_results}|{region_code}|{relevance_language}"
+        cached = await self.search_cache.aget(cache_key)
+        if cached is not None:
+            logger.info("YouTube search cache hit for query: %s", query)
+            return cached
+
+        if not self.youtube_client:
+            logger.error("YouTube client not initialized")
+            return await self._offline_results(cache_key, query, max_results)
+
+        if not await self.quota.try_spend(SEARCH_QUOTA_COST):
+            logger.warning("YouTube quota nearly exhausted, serving cached results for: %s", query)
+            return await self._offline_results(cache_key, query, max_results)
 
-    def search_videos(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         try:
-            if not self.youtube_client:
-                logger.error("YouTube client not initialized")
-                return []
-                
-            logger.info(f"Searching YouTube for videos: {query}")
-            
-            search_response = self.youtube_client.search().list(
+            logger.info("Searching YouTube for videos: %s", query)
+
+            search_response = await self.youtube_client.search(
                 q=query,
                 part='id,snippet',
                 type='video',
                 maxResults=max_results,
                 order='relevance',
-                regionCode='ID', 
-                relevanceLanguage='id' 
-            ).execute()
-            
+                regionCode=region_code,
+                relevanceLanguage=relevance_language
+            )
+
             videos = []
             for search_result in search_response.get('items', []):
                 video_data = {
@@ -53,14 +217,126 @@ class YouTubeService:
                     'video_url': f"https://www.youtube.com/watch?v={search_result['id']['videoId']}"
                 }
                 videos.append(video_data)
-                logger.info(f"Found video: {video_data['title']}")
-            
-            logger.info(f"Found {len(videos)} videos for query: {query}")
+                logger.info("Found video: %s", video_data['title'])
+
+            await self.search_cache.aset(cache_key, videos)
+            logger.info("Found %s videos for query: %s", len(videos), query)
             return videos
-            
+
         except Exception as e:
-            logger.error(f"Error searching YouTube videos: {e}")
+            logger.error("Error searching YouTube videos: %s", e)
+            return await self._offline_results(cache_key, query, max_results)
+
+    async def _offline_results(self, cache_key: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Serve a search without calling the API: stale cache first, then the catalog."""
+        stale = await self.search_cache.aget(cache_key, allow_stale=True)
+        if stale is not None:
+            return stale
+        # Scans every cached search
+        return await asyncio.to_thread(self.search_catalog, query, max_results)
+
+    def search_catalog(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """Rank every previously fetched video by word overlap with ``query``."""
+        query_terms = set(re.findall(r"\w+", query.lower()))
+        if not query_terms:
             return []
 
+        scored = {}
+        for _, videos in self.search_cache.items(include_stale=True):
+            for video in videos:
+                text_terms = set(re.findall(r"\w+", f"{video['title']} {video['description']}".lower()))
+                score = len(query_terms & text_terms)
+                if score and video['video_id'] not in scored:
+                    scored[video['video_id']] = (score, video)
+
+        ranked = sorted(scored.values(), key=lambda item: item[0], reverse=True)
+        videos = [video for _, video in ranked[:max_results]]
+        logger.info("Catalog returned %s videos for query: %s", len(videos), query)
+        return videos
+
+    async def get_video_details(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch full metadata for ``video_ids``, batching up to 50 ids per videos().list call.
+
+        Results are cached per video id; only ids missing from the cache hit the API.
+        """
+        unique_ids = list(dict.fromkeys(video_ids))
+        details = await self.details_cache.aget_many(unique_ids)
+        missing = [video_id for video_id in unique_ids if video_id not in details]
+
+        if not missing or not self.youtube_client:
+            return details
+
+        for start in range(0, len(missing), VIDEOS_LIST_BATCH_SIZE):
+            batch = missing[start:start + VIDEOS_LIST_BATCH_SIZE]
+            if not await self.quota.try_spend(VIDEOS_LIST_QUOTA_COST):
+                logger.warning("YouTube quota nearly exhausted, skipping video detail enrichment")
+                break
+
+            try:
+                response = await self.youtube_client.videos_list(
+                    id=",".join(batch),
+                    part='snippet,contentDetails,status,statistics,topicDetails'
+                )
+            except Exception as e:
+                logger.error("Error fetching YouTube video details: %s", e)
+                continue
+
+            fetched = {item['id']: self._parse_video_details(item) for item in response.get('items', [])}
+            await self.details_cache.aset_many(fetched)
+            details.update(fetched)
+
+        logger.info("Fetched details for %s/%s videos", len(details), len(video_ids))
+        return details
+
+    def _parse_video_details(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        snippet = item.get('snippet', {})
+        content_details = item.get('contentDetails', {})
+        status = item.get('status', {})
+        statistics = item.get('statistics', {})
+        region_restriction = content_details.get('regionRestriction', {})
+
+        return {
+            'description': snippet.get('description', ''),
+            'tags': snippet.get('tags', []),
+            'duration_seconds': parse_iso_duration(content_details.get('duration', '')),
+            'definition': content_details.get('definition'),
+            'embeddable': status.get('embeddable', True),
+            'privacy_status': status.get('privacyStatus'),
+            'allowed_regions': region_restriction.get('allowed'),
+            'blocked_regions': region_restriction.get('blocked', []),
+            'view_count': int(statistics.get('viewCount', 0)),
+            'like_count': int(statistics.get('likeCount', 0)),
+            'topic_categories': item.get('topicDetails', {}).get('topicCategories', []),
+        }
+
+    async def enrich_videos(self, videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge full video metadata into search results. Videos without details are kept as-is."""
+        details = await self.get_video_details([video['video_id'] for video in videos])
+        return [{**video, **details.get(video['video_id'], {})} for video in videos]
+
+    def is_playable(self, video: Dict[str, Any], max_duration_seconds: Optional[int] = None, region_code: str = 'ID') -> bool:
+        """Cheap pre-filter on enriched metadata for videos that cannot be served in the game."""
+        if not video.get('embeddable', True):
+            logger.info("Skipping non-embeddable video: %s", video['video_id'])
+            return False
+        if video.get('privacy_status') not in (None, 'public', 'unlisted'):
+            logger.info("Skipping private video: %s", video['video_id'])
+            return False
+
+        allowed_regions = video.get('allowed_regions')
+        if region_code in video.get('blocked_regions', []) or (allowed_regions is not None and region_code not in allowed_regions):
+            logger.info("Skipping video blocked in %s: %s", region_code, video['video_id'])
+            return False
+
+        duration = video.get('duration_seconds')
+        if max_duration_seconds and duration and duration > max_duration_seconds:
+            logger.info("Skipping video longer than %ss: %s (%ss)", max_duration_seconds, video['video_id'], duration)
+            return False
+
+        return True
+
     def is_client_available(self) -> bool:
-        return self.youtube_client is not None
\ No newline at end of file
+        return self.youtube_client is not None
+
+    async def aclose(self):
+        await self.youtube_client.aclose()
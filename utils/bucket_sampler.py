@@ -0,0 +1,118 @@
+"""
+Thompson sampling over scrape buckets.
+
+A bucket is any hashable key, such as ``(media_type, province, category)``.
+Every attempt records whether the bucket produced a usable result and how long
+it took. ``choose`` draws a success rate for each candidate from its Beta
+posterior and then picks a bucket with probability proportional to
+``rate ** greediness`` per second of latency. Productive and fast buckets come
+up more often, while uncertain ones are still tried. Picking in proportion,
+rather than always taking the best draw, keeps the mix varied across the many
+buckets that work. With probability ``coverage`` the draw is uniform instead,
+so no bucket is starved entirely.
+"""
+
+import json
+import logging
+import random
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Sequence, Union
+
+from utils.cache import JsonFileWriter
+
+logger = logging.getLogger(__name__)
+
+# Separates the parts of a tuple bucket in the persisted JSON keys
+KEY_SEPARATOR = "|"
+
+
+class BucketSampler:
+    """Thread-safe Beta-Bernoulli bandit with a latency estimate per bucket.
+
+    Counts are halved once a bucket has ``max_observations`` outcomes, which
+    keeps the posterior responsive when a bucket's yield changes. With
+    ``persist_path`` the stats are written back in the background.
+    """
+
+    def __init__(
+        self,
+        coverage: float = 0.1,
+        greediness: float = 2.0,
+        max_observations: int = 200,
+        latency_smoothing: float = 0.2,
+        persist_path: Optional[Union[str, Path]] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.coverage = coverage
+        self.greediness = greediness
+        self.max_observations = max_observations
+        self.latency_smoothing = latency_smoothing
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._rng = rng or random.Random()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._writer = JsonFileWriter(self.persist_path, self._snapshot) if self.persist_path else None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def choose(self, buckets: Sequence[Hashable]) -> Hashable:
+        """Pick one of ``buckets``."""
+        if not buckets:
+            raise ValueError("No buckets to choose from")
+        if self._rng.random() < self.coverage:
+            return self._rng.choice(buckets)
+
+        with self._lock:
+            stats = [self._stats.get(self._key(bucket)) for bucket in buckets]
+            latencies = [s["latency"] for s in stats if s and s.get("latency")]
+            # Untried buckets are assumed to be as fast as the average tried one
+            default_latency = sum(latencies) / len(latencies) if latencies else 1.0
+
+            weights = []
+            for s in stats:
+                successes = s["successes"] if s else 0.0
+                failures = s["failures"] if s else 0.0
+                rate = self._rng.betavariate(1 + successes, 1 + failures)
+                latency = (s or {}).get("latency") or default_latency
+                weights.append(rate ** self.greediness / max(latency, 1e-3))
+            return self._rng.choices(buckets, weights)[0]
+
+    def record(self, bucket: Hashable, success: bool, latency_seconds: float) -> None:
+        """Add one outcome for ``bucket``."""
+        with self._lock:
+            s = self._stats.setdefault(self._key(bucket), {"successes": 0.0, "failures": 0.0, "latency": None})
+            s["successes" if success else "failures"] += 1
+            if s["successes"] + s["failures"] > self.max_observations:
+                s["successes"] /= 2
+                s["failures"] /= 2
+            if s["latency"] is None:
+                s["latency"] = latency_seconds
+            else:
+                s["latency"] += self.latency_smoothing * (latency_seconds - s["latency"])
+        if self._writer is not None:
+            self._writer.mark_dirty()
+
+    def stats(self, bucket: Hashable) -> Optional[Dict[str, float]]:
+        with self._lock:
+            s = self._stats.get(self._key(bucket))
+            return dict(s) if s else None
+
+    @staticmethod
+    def _key(bucket: Hashable) -> str:
+        return KEY_SEPARATOR.join(map(str, bucket)) if isinstance(bucket, tuple) else str(bucket)
+
+    def _load(self) -> None:
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            self._stats = json.loads(self.persist_path.read_text(encoding="utf-8"))
+            logger.info("Loaded sampler stats for %s buckets from %s", len(self._stats), self.persist_path)
+        except Exception as e:
+            logger.warning("Could not load sampler stats from %s: %s", self.persist_path, e)
+
+    def _snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: dict(s) for key, s in self._stats.items()}
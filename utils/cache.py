@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("CACHE_DIR", ".cache"))
+# Persisted files are rewritten at most this often; 0 writes on every change
+PERSIST_INTERVAL_SECONDS = float(os.getenv("CACHE_PERSIST_INTERVAL_SECONDS", 5))
+
+_writers: "weakref.WeakSet[JsonFileWriter]" = weakref.WeakSet()
+
+
+class JsonFileWriter:
+    """Writes a JSON snapshot of some in-memory state to ``path``, off the caller's thread.
+
+    ``mark_dirty`` only flags the state as changed and arms a timer. After
+    ``interval`` seconds a background thread takes ``snapshot()`` and replaces
+    the file atomically, so a burst of changes costs one write. ``flush`` writes
+    immediately; ``flush_all`` does that for every writer at shutdown.
+    """
+
+    def __init__(self, path: Union[str, Path], snapshot: Callable[[], Any], interval: float = PERSIST_INTERVAL_SECONDS):
+        self.path = Path(path)
+        self.snapshot = snapshot
+        self.interval = interval
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        _writers.add(self)
+
+    def mark_dirty(self) -> None:
+        if self.interval <= 0:
+            with self._lock:
+                self._dirty = True
+            self.flush()
+            return
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                data = json.dumps(self.snapshot())
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp_path.write_text(data, encoding="utf-8")
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning("Could not persist %s: %s", self.path, e)
+
+
+def flush_all() -> None:
+    """Write every pending ``JsonFileWriter`` now, e.g. when the app shuts down."""
+    for writer in list(_writers):
+        writer.flush()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl_seconds``.
+
+    When ``persist_path`` is given, entries are loaded from and written back to a
+    JSON file so the cache survives restarts. Values must be JSON-serializable.
+    Writes are batched by a ``JsonFileWriter``, so ``set`` never touches the disk.
+    Expired entries are kept until evicted so callers can still fall back to them
+    with ``allow_stale=True``. Named caches report hits and misses to ``/metrics``.
+
+    With a shared ``state`` (see ``services.shared_state``) and a ``name``, entries
+    are stored there instead, so every worker process sees the same cache. Shared
+    entries are dropped after ``STALE_TTL_FACTOR * ttl_seconds`` rather than by LRU.
+    Coroutines should use ``aget``/``aset``/``aset_many``, which keep the shared
+    backend's I/O off the event loop.
+    """
+
+    STALE_TTL_FACTOR = 10
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        persist_path: Optional[Union[str, Path]] = None,
+        name: Optional[str] = None,
+        state: Optional[Any] = None,
+    ):
+        if state is not None and not name:
+            raise ValueError("A shared cache needs a name")
+        self.name = name
+        self.state = state
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = JsonFileWriter(self.persist_path, self._snapshot) if self.persist_path and state is None else None
+        if state is None:
+            self._load()
+
+    @property
+    def _prefix(self) -> str:
+        return f"cache:{self.name}:"
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        # Shared entries come back from JSON as [stored_at, value]
+        entry = self.state.get(self._prefix + key) if self.state is not None else None
+        with self._lock:
+            if self.state is None:
+                entry = self._entries.get(key)
+            if entry is None or (not allow_stale and time.time() - entry[0] > self.ttl_seconds):
+                self.misses += 1
+                hit = False
+            else:
+                if self.state is None:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                hit = True
+
+        if self.name:
+            record_cache_lookup(self.name, hit)
+        return entry[1] if hit else None
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    @property
+    def _blocking(self) -> bool:
+        return self.state is not None and self.state.shared
+
+    async def aget(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        if self._blocking:
+            return await asyncio.to_thread(self.get, key, allow_stale)
+        return self.get(key, allow_stale)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Fresh entries for ``keys``; missing and expired keys are left out."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        if self._blocking:
+            return await asyncio.to_thread(self.get_many, list(keys))
+        return self.get_many(keys)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await self.aset_many({key: value})
+
+    async def aset_many(self, values: Dict[str, Any]) -> None:
+        if self._blocking:
+            await asyncio.to_thread(self.set_many, values)
+        else:
+            self.set_many(values)
+
+    def set_many(self, values: Dict[str, Any]) -> None:
+        """Store several entries at once."""
+        if self.state is not None:
+            now = time.time()
+            self.state.set_many(
+                {self._prefix + key: [now, value] for key, value in values.items()},
+                ttl=self.ttl_seconds * self.STALE_TTL_FACTOR,
+            )
+            return
+        with self._lock:
+            now = time.time()
+            for key, value in values.items():
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self._writer is not None:
+            self._writer.mark_dirty()
+
+    def items(self, include_stale: bool = False) -> Iterator[Tuple[str, Any]]:
+        now = time.time()
+        if self.state is not None:
+            snapshot = [
+                (key[len(self._prefix):], tuple(entry))
+                for key, entry in self.state.scan(self._prefix)
+            ]
+        else:
+            with self._lock:
+                snapshot = list(self._entries.items())
+        for key, (stored_at, value) in snapshot:
+            if include_stale or now - stored_at <= self.ttl_seconds:
+                yield key, value
+
+    def __len__(self) -> int:
+        if self.state is not None:
+            return sum(1 for _ in self.state.scan(self._prefix))
+        return len(self._entries)
+
+    def _load(self) -> None:
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            data = json.loads(self.persist_path.read_text(encoding="utf-8"))
+            for key, (stored_at, value) in data.items():
+                self._entries[key] = (float(stored_at), value)
+            logger.info("Loaded %s cache entries from %s", len(self._entries), self.persist_path)
+        except Exception as e:
+            logger.warning("Could not load cache from %s: %s", self.persist_path, e)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {key: [stored_at, value] for key, (stored_at, value) in self._entries.items()}
@@ -1,6 +1,12 @@
 import base64
+import io
 import requests
 
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+
 def read_url_as_base64(image_url: str) -> str:
     headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
@@ -9,3 +15,28 @@ def read_url_as_base64(image_url: str) -> str:
     response = requests.get(image_url, headers=headers)
     response.raise_for_status()
     return base64.b64encode(response.content).decode("utf-8")
+
+def guess_image_mime_type(image_bytes: bytes) -> str:
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_bytes.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if image_bytes.startswith(b"RIFF") and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+def downscale_image(image_bytes: bytes, max_side: int = 512, quality: int = 85) -> bytes:
+    """Return a JPEG copy of the image whose longest side is at most ``max_side``.
+
+    Falls back to the original bytes when Pillow is not installed.
+    """
+    if Image is None:
+        return image_bytes
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality)
+        return output.getvalue()
@@ -0,0 +1,41 @@
+import asyncio
+import importlib
+import threading
+from types import ModuleType
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """Builds a value on first use, so the modules behind it are only imported then.
+
+    ``get()`` builds synchronously and is thread-safe. Awaiting the instance, e.g.
+    when it is used as a FastAPI dependency, builds it in a worker thread. That way
+    the first request does not stall the event loop while heavy SDKs import.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    async def __call__(self) -> T:
+        if self._value is not None:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+
+def lazy_import(module_name: str) -> Lazy[ModuleType]:
+    return Lazy(lambda: importlib.import_module(module_name))
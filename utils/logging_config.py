@@ -0,0 +1,149 @@
+"""
+Process-wide logging setup.
+
+Records go to stdout as plain text or, with ``LOG_FORMAT=json``, as one JSON
+object per line. Every record carries the id of the request it was logged under.
+Levels can be overridden per module and chatty loggers can be sampled, e.g.::
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=services.scrape_service=WARNING,httpx=WARNING
+    LOG_SAMPLE_RATES=services.youtube_service=0.1
+
+Sampling only ever drops DEBUG and INFO records. A single call can set its own
+rate with ``extra={"sample_rate": 0.01}``.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Id of the request being handled, attached to every log record
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "sample_rate", "taskName",
+}
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reuse a well-formed incoming request id, otherwise generate one."""
+    if incoming and _VALID_REQUEST_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def parse_mapping(spec: str) -> Dict[str, str]:
+    """Parse ``"a=1,b.c=2"`` into ``{"a": "1", "b.c": "2"}``, skipping malformed entries."""
+    mapping = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, value = entry.partition("=")
+        if sep and name.strip() and value.strip():
+            mapping[name.strip()] = value.strip()
+    return mapping
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG/INFO records per logger, matched by the longest name prefix."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def rate_for(self, logger_name: str) -> float:
+        rate = self._resolved.get(logger_name)
+        if rate is None:
+            rate = 1.0
+            best = -1
+            for prefix, prefix_rate in self.rates.items():
+                if (logger_name == prefix or logger_name.startswith(prefix + ".")) and len(prefix) > best:
+                    rate, best = prefix_rate, len(prefix)
+            self._resolved[logger_name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON, including any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", request_id_var.get()),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def configure_logging(
+    log_format: Optional[str] = None,
+    level: Optional[str] = None,
+    module_levels: Optional[Dict[str, str]] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+):
+    """Install a single stdout handler on the root logger. Arguments default to the environment."""
+    log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    if module_levels is None:
+        module_levels = parse_mapping(os.getenv("LOG_LEVELS", ""))
+    if sample_rates is None:
+        sample_rates = {}
+        for name, rate in parse_mapping(os.getenv("LOG_SAMPLE_RATES", "")).items():
+            try:
+                sample_rates[name] = max(0.0, min(1.0, float(rate)))
+            except ValueError:
+                pass
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.addFilter(RequestIdFilter())
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    # Let uvicorn's loggers flow through the same handler and format
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
@@ -0,0 +1,240 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters and histograms are recorded in memory and rendered by the ``/metrics``
+endpoint. ``stage`` times a pipeline stage under the current endpoint and, when
+``opentelemetry`` is installed, also opens a span for it.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - OpenTelemetry is optional
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Route currently being served, used to label stage timings
+current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("current_endpoint", default="background")
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [
+                (self.name, dict(zip(self.labelnames, key)), value)
+                for key, value in self._values.items()
+            ]
+
+
+class Histogram:
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        with self._lock:
+            for key, (counts, (total, count)) in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                for bound, bucket_count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), bucket_count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterator[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _get_or_create(self, metric_class, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            return self._metrics[name]
+
+    def register_collector(self, collector: Callable[[], Iterator[Tuple[str, str, str, List[Sample]]]]):
+        """Register a callable yielding ``(name, type, help, samples)`` computed at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        families = [(metric.name, metric.type_name, metric.documentation, metric.samples()) for metric in list(self._metrics.values())]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+
+        for name, type_name, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+STAGE_DURATION = metrics_registry.histogram(
+    "culturate_stage_duration_seconds",
+    "Duration of pipeline stages per endpoint.",
+    ["endpoint", "stage"],
+)
+STAGE_ERRORS = metrics_registry.counter(
+    "culturate_stage_errors_total",
+    "Pipeline stages that raised an exception.",
+    ["endpoint", "stage"],
+)
+REQUEST_DURATION = metrics_registry.histogram(
+    "culturate_http_request_duration_seconds",
+    "HTTP request latency per route.",
+    ["method", "route", "status"],
+)
+MODEL_CALLS = metrics_registry.counter(
+    "culturate_model_calls_total",
+    "Gemini calls per model and outcome.",
+    ["model", "outcome"],
+)
+MODEL_RETRIES = metrics_registry.counter(
+    "culturate_model_retries_total",
+    "Gemini call retries per model.",
+    ["model"],
+)
+MODEL_TOKENS = metrics_registry.counter(
+    "culturate_model_tokens_total",
+    "Gemini tokens reported in response metadata.",
+    ["model", "kind"],
+)
+CACHE_REQUESTS = metrics_registry.counter(
+    "culturate_cache_requests_total",
+    "Cache lookups per cache and result.",
+    ["cache", "result"],
+)
+GUESS_RESULTS = metrics_registry.counter(
+    "culturate_guess_results_total",
+    "Scored province guesses by inference tier, difficulty and correctness.",
+    ["tier", "difficulty", "correct"],
+)
+SCRAPE_ATTEMPTS = metrics_registry.counter(
+    "culturate_scrape_attempts_total",
+    "Scrape pipeline attempts by media type and whether they produced valid media.",
+    ["media_type", "valid"],
+)
+VIDEO_GUESS_TIERS = metrics_registry.counter(
+    "culturate_video_guess_tiers_total",
+    "YouTube guesses by how they were answered: thumbnail, escalated or video.",
+    ["tier"],
+)
+
+
+@contextmanager
+def stage(name: str, endpoint: Optional[str] = None) -> Iterator[None]:
+    """Time a pipeline stage, labelled with the current endpoint unless one is given."""
+    endpoint = endpoint or current_endpoint.get()
+    span = otel_trace.get_tracer(__name__).start_as_current_span(f"{endpoint} {name}") if otel_trace else nullcontext()
+
+    start = time.perf_counter()
+    with span:
+        try:
+            yield
+        except BaseException:
+            STAGE_ERRORS.inc(endpoint=endpoint, stage=name)
+            raise
+        finally:
+            STAGE_DURATION.observe(time.perf_counter() - start, endpoint=endpoint, stage=name)
+
+
+def record_cache_lookup(cache_name: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache_name, result="hit" if hit else "miss")
+
+
+def record_guess_result(tier: Optional[str], difficulty: str, correct: bool):
+    GUESS_RESULTS.inc(tier=tier or "unknown", difficulty=difficulty, correct=str(correct).lower())
+
+
+def record_model_usage(model_name: str, response: Any):
+    """Record token usage from a LangChain message or a google.generativeai response."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+
+    if isinstance(usage, dict):
+        prompt_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+    else:
+        prompt_tokens = getattr(usage, "prompt_token_count", 0)
+        output_tokens = getattr(usage, "candidates_token_count", 0)
+
+    MODEL_TOKENS.inc(prompt_tokens or 0, model=model_name, kind="prompt")
+    MODEL_TOKENS.inc(output_tokens or 0, model=model_name, kind="completion")
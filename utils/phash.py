@@ -0,0 +1,209 @@
+"""
+Perceptual hashing for spotting near-duplicate images.
+
+``dhash`` reduces an image to a 64-bit difference hash. Re-encoded, resized or
+lightly edited copies of a photo land within a few bits of each other.
+``BKTree`` finds every stored hash within a Hamming radius without comparing
+against all of them. ``ImageHashIndex`` combines the two with a record per image
+and can persist itself to JSON.
+"""
+
+import io
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+
+from utils.cache import JsonFileWriter
+from utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def dhash(image_bytes: bytes, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: shrink to ``(hash_size + 1) x hash_size`` grayscale and
+    record whether each pixel is brighter than its right-hand neighbour."""
+    if Image is None:
+        raise RuntimeError("Pillow is required for perceptual hashing")
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # Let JPEG decode at a reduced scale; the hash only needs a few pixels
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        image = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+        pixels = list(image.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def try_dhash(image_bytes: Optional[bytes]) -> Optional[int]:
+    """``dhash`` that returns None for missing, truncated or undecodable images."""
+    if not image_bytes or Image is None:
+        return None
+    try:
+        return dhash(image_bytes)
+    except Exception as e:
+        logger.debug("Could not hash image: %s", e)
+        return None
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance.
+
+    Each child edge is labelled with its distance to the parent. The triangle
+    inequality then limits a radius-``r`` search to edges within ``r`` of the
+    query's distance to that node.
+    """
+
+    def __init__(self):
+        self._root: Optional[Tuple[int, Dict[int, Any]]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int) -> bool:
+        """Insert ``value``; returns False if it is already present."""
+        if self._root is None:
+            self._root = (value, {})
+            self._size = 1
+            return True
+
+        node_value, children = self._root
+        while True:
+            distance = hamming(value, node_value)
+            if distance == 0:
+                return False
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (value, {})
+                self._size += 1
+                return True
+            node_value, children = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """Return ``(distance, stored_value)`` pairs within ``max_distance``, closest first."""
+        if self._root is None:
+            return []
+
+        matches = []
+        pending = [self._root]
+        while pending:
+            node_value, children = pending.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                matches.append((distance, node_value))
+            for edge in range(distance - max_distance, distance + max_distance + 1):
+                child = children.get(edge)
+                if child is not None:
+                    pending.append(child)
+        matches.sort()
+        return matches
+
+
+class ImageHashIndex:
+    """Thread-safe near-duplicate index mapping image hashes to a record dict.
+
+    ``find`` returns the closest stored record within ``max_distance`` bits, so a
+    caller can reject an image it has already served or reuse an earlier verdict.
+    Records are also indexed by URL so exact repeats are caught before any fetch.
+    Past ``max_entries`` the oldest half is dropped and the tree is rebuilt.
+    With ``persist_path`` the records are written back in the background.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 8,
+        max_entries: int = 50000,
+        persist_path: Optional[Union[str, Path]] = None,
+        name: Optional[str] = None,
+    ):
+        self.name = name
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._tree = BKTree()
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._by_url: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._writer = JsonFileWriter(self.persist_path, self._snapshot) if self.persist_path else None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def find(self, image_hash: int) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Closest ``(distance, record)`` within ``max_distance``, or None."""
+        with self._lock:
+            matches = self._tree.search(image_hash, self.max_distance)
+            match = (matches[0][0], dict(self._records[matches[0][1]])) if matches else None
+        if self.name:
+            record_cache_lookup(self.name, match is not None)
+        return match
+
+    def find_url(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            image_hash = self._by_url.get(url)
+            return dict(self._records[image_hash]) if image_hash is not None else None
+
+    def add(self, image_hash: int, **fields: Any) -> None:
+        """Insert or update the record for ``image_hash``."""
+        with self._lock:
+            record = self._records.setdefault(image_hash, {})
+            record.update(fields, updated_at=time.time())
+            self._tree.add(image_hash)
+            if record.get("url"):
+                self._by_url[record["url"]] = image_hash
+            if len(self._records) > self.max_entries:
+                self._evict()
+        if self._writer is not None:
+            self._writer.mark_dirty()
+
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            snapshot = [(image_hash, dict(record)) for image_hash, record in self._records.items()]
+        return iter(snapshot)
+
+    def _evict(self) -> None:
+        keep = sorted(self._records.items(), key=lambda item: item[1].get("updated_at", 0))[len(self._records) // 2:]
+        self._rebuild(dict(keep))
+
+    def _rebuild(self, records: Dict[int, Dict[str, Any]]) -> None:
+        self._records = records
+        self._tree = BKTree()
+        self._by_url = {}
+        for image_hash, record in records.items():
+            self._tree.add(image_hash)
+            if record.get("url"):
+                self._by_url[record["url"]] = image_hash
+
+    def _load(self) -> None:
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            data = json.loads(self.persist_path.read_text(encoding="utf-8"))
+            self._rebuild({int(image_hash, 16): record for image_hash, record in data.items()})
+            logger.info("Loaded %s image hashes from %s", len(self._records), self.persist_path)
+        except Exception as e:
+            logger.warning("Could not load image hashes from %s: %s", self.persist_path, e)
+
+    def _snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {f"{image_hash:016x}": dict(record) for image_hash, record in self._records.items()}
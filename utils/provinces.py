@@ -0,0 +1,176 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# The 33 provinces used throughout the game
+PROVINCES = [
+    "Aceh", "Sumatera Utara", "Sumatera Barat", "Riau", "Kepulauan Riau",
+    "Jambi", "Sumatera Selatan", "Kepulauan Bangka Belitung", "Bengkulu", "Lampung",
+    "DKI Jakarta", "Jawa Barat", "Banten", "Jawa Tengah", "DI Yogyakarta",
+    "Jawa Timur", "Bali", "Nusa Tenggara Barat", "Nusa Tenggara Timur",
+    "Kalimantan Barat", "Kalimantan Tengah", "Kalimantan Selatan", "Kalimantan Timur",
+    "Kalimantan Utara", "Sulawesi Utara", "Gorontalo", "Sulawesi Tengah",
+    "Sulawesi Selatan", "Sulawesi Barat", "Sulawesi Tenggara", "Maluku",
+    "Maluku Utara", "Papua"
+]
+
+# Indonesian/English variants and common abbreviations. Provinces created after the
+# 33-province list (the Papua splits) map onto the province they were carved from.
+PROVINCE_ALIASES: Dict[str, List[str]] = {
+    "Aceh": ["Nanggroe Aceh Darussalam", "NAD", "Daerah Istimewa Aceh"],
+    "Sumatera Utara": ["Sumut", "Sumatra Utara", "North Sumatra", "North Sumatera"],
+    "Sumatera Barat": ["Sumbar", "Sumatra Barat", "West Sumatra", "West Sumatera"],
+    "Riau": [],
+    "Kepulauan Riau": ["Kepri", "Riau Islands", "Riau Archipelago"],
+    "Jambi": [],
+    "Sumatera Selatan": ["Sumsel", "Sumatra Selatan", "South Sumatra", "South Sumatera"],
+    "Kepulauan Bangka Belitung": ["Babel", "Bangka Belitung", "Bangka Belitung Islands"],
+    "Bengkulu": [],
+    "Lampung": [],
+    "DKI Jakarta": [
+        "Jakarta", "DKI", "Jakarta Raya", "Daerah Khusus Ibukota Jakarta",
+        "Daerah Khusus Jakarta", "Special Capital Region of Jakarta",
+    ],
+    "Jawa Barat": ["Jabar", "West Java"],
+    "Banten": [],
+    "Jawa Tengah": ["Jateng", "Central Java"],
+    "DI Yogyakarta": [
+        "Yogyakarta", "DIY", "Jogja", "Jogjakarta", "Yogya", "Daerah Istimewa Yogyakarta",
+        "Special Region of Yogyakarta",
+    ],
+    "Jawa Timur": ["Jatim", "East Java"],
+    "Bali": [],
+    "Nusa Tenggara Barat": ["NTB", "West Nusa Tenggara"],
+    "Nusa Tenggara Timur": ["NTT", "East Nusa Tenggara"],
+    "Kalimantan Barat": ["Kalbar", "West Kalimantan"],
+    "Kalimantan Tengah": ["Kalteng", "Central Kalimantan"],
+    "Kalimantan Selatan": ["Kalsel", "South Kalimantan"],
+    "Kalimantan Timur": ["Kaltim", "East Kalimantan"],
+    "Kalimantan Utara": ["Kaltara", "North Kalimantan"],
+    "Sulawesi Utara": ["Sulut", "North Sulawesi"],
+    "Gorontalo": [],
+    "Sulawesi Tengah": ["Sulteng", "Central Sulawesi"],
+    "Sulawesi Selatan": ["Sulsel", "South Sulawesi"],
+    "Sulawesi Barat": ["Sulbar", "West Sulawesi"],
+    "Sulawesi Tenggara": ["Sultra", "Southeast Sulawesi", "South East Sulawesi"],
+    "Maluku": ["Moluccas", "Maluku Islands"],
+    "Maluku Utara": ["Malut", "North Maluku"],
+    "Papua": [
+        "Papua Barat", "West Papua", "Papua Barat Daya", "Southwest Papua", "Papua Tengah",
+        "Central Papua", "Papua Pegunungan", "Highland Papua", "Papua Selatan", "South Papua",
+        "Irian Jaya",
+    ],
+}
+
+_PREFIXES = ("provinsi ", "propinsi ", "province of ", "prov ")
+_SUFFIXES = (" province", " provinsi")
+
+
+def normalize_text(name: str) -> str:
+    """Lowercase, strip accents and punctuation, and drop "provinsi"/"province" wrappers."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    text = " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+    for prefix in _PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    for suffix in _SUFFIXES:
+        if text.endswith(suffix):
+            text = text[: -len(suffix)]
+    return text
+
+
+def _max_distance(length: int) -> int:
+    # Short keys are mostly abbreviations (NTB vs NTT) and must match exactly
+    if length <= 4:
+        return 0
+    if length <= 8:
+        return 1
+    return 2
+
+
+class ProvinceIndex:
+    """Precomputed trie of canonical province names and aliases.
+
+    Exact lookups walk the trie in O(length of the name). Misspellings fall back to
+    a Levenshtein search over the same trie that prunes branches once the distance
+    bound is exceeded. Ambiguous fuzzy matches resolve to no province.
+    """
+
+    _END = "$"
+
+    def __init__(self, aliases: Dict[str, List[str]]):
+        self._root: Dict[str, dict] = {}
+        for canonical, names in aliases.items():
+            for name in [canonical] + names:
+                self._insert(normalize_text(name), canonical)
+
+    def _insert(self, key: str, canonical: str):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        node[self._END] = canonical
+
+    def _exact(self, key: str) -> Optional[str]:
+        node = self._root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get(self._END)
+
+    def _fuzzy(self, key: str, max_distance: int) -> Optional[str]:
+        best: Dict[str, int] = {}
+        first_row = list(range(len(key) + 1))
+
+        def walk(node: dict, char: str, previous_row: List[int]):
+            row = [previous_row[0] + 1]
+            for column in range(1, len(key) + 1):
+                row.append(min(
+                    row[column - 1] + 1,
+                    previous_row[column] + 1,
+                    previous_row[column - 1] + (key[column - 1] != char),
+                ))
+            canonical = node.get(self._END)
+            if canonical is not None and row[-1] <= max_distance:
+                best[canonical] = min(row[-1], best.get(canonical, row[-1]))
+            if min(row) <= max_distance:
+                for next_char, child in node.items():
+                    if next_char != self._END:
+                        walk(child, next_char, row)
+
+        for char, child in self._root.items():
+            if char != self._END:
+                walk(child, char, first_row)
+
+        if not best:
+            return None
+        ranked: List[Tuple[int, str]] = sorted((distance, canonical) for canonical, distance in best.items())
+        if len(ranked) > 1 and ranked[0][0] == ranked[1][0]:
+            return None
+        return ranked[0][1]
+
+    def lookup(self, name: Optional[str]) -> Optional[str]:
+        """Return the canonical province for ``name``, or None if it cannot be resolved."""
+        if not name:
+            return None
+        key = normalize_text(name)
+        if not key:
+            return None
+        return self._exact(key) or self._fuzzy(key, _max_distance(len(key)))
+
+
+province_index = ProvinceIndex(PROVINCE_ALIASES)
+
+
+@lru_cache(maxsize=4096)
+def canonical_province(name: Optional[str]) -> Optional[str]:
+    """Return the canonical spelling of ``name`` from ``PROVINCES``, resolving aliases and typos."""
+    return province_index.lookup(name)
+
+
+def provinces_match(guess: Optional[str], actual: Optional[str]) -> bool:
+    """Whether two province names refer to the same province."""
+    guess_province = canonical_province(guess)
+    return guess_province is not None and guess_province == canonical_province(actual)
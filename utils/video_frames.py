@@ -0,0 +1,193 @@
+"""
+Local keyframe sampling for direct video URLs.
+
+Instead of handing a whole video to the model, the first ``max_bytes`` of the
+file are streamed to a temporary file and a handful of visually distinct frames
+are extracted from its first ``max_seconds``. The frames come back as small
+JPEGs.
+
+Decoding uses PyAV when it is installed and otherwise the ``ffmpeg`` binary.
+With neither available, or when the truncated file cannot be decoded (e.g. an
+MP4 whose index sits at the end), no frames are returned and callers fall back
+to sending the video itself.
+"""
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.parse
+from typing import List, Optional, Sequence, TypeVar
+
+import requests
+
+try:
+    import av
+except ImportError:  # pragma: no cover - PyAV is optional
+    av = None
+
+try:
+    from PIL import Image, ImageChops, ImageStat
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", 32 * 1024 * 1024))
+VIDEO_MAX_SECONDS = float(os.getenv("VIDEO_MAX_SECONDS", 180))
+KEYFRAME_MAX_FRAMES = int(os.getenv("VIDEO_KEYFRAME_MAX_FRAMES", 6))
+KEYFRAME_MAX_SIDE = int(os.getenv("VIDEO_KEYFRAME_MAX_SIDE", 512))
+# Minimum change between kept frames, as a fraction of full brightness scale
+SCENE_THRESHOLD = float(os.getenv("VIDEO_SCENE_THRESHOLD", 0.1))
+# Wall-clock limit for download plus decoding
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("VIDEO_EXTRACT_TIMEOUT_SECONDS", 30))
+
+JPEG_QUALITY = 80
+# Scene candidates collected before thinning them out to ``max_frames``
+CANDIDATE_FACTOR = 8
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+
+
+def keyframe_backend() -> Optional[str]:
+    """The decoder keyframes would be extracted with, or None if there is none."""
+    if av is not None and Image is not None:
+        return "pyav"
+    if shutil.which("ffmpeg"):
+        return "ffmpeg"
+    return None
+
+
+def evenly_spaced(items: Sequence[T], count: int) -> List[T]:
+    """Pick ``count`` items spread across ``items``, always keeping the first."""
+    if len(items) <= count:
+        return list(items)
+    step = len(items) / count
+    return [items[int(i * step)] for i in range(count)]
+
+
+def download_prefix(url: str, max_bytes: int = VIDEO_MAX_BYTES, timeout: float = EXTRACT_TIMEOUT_SECONDS) -> Optional[str]:
+    """Stream at most ``max_bytes`` of ``url`` into a temporary file and return its path."""
+    suffix = os.path.splitext(urllib.parse.urlparse(url).path)[1] or ".mp4"
+    deadline = time.monotonic() + timeout
+    fd, path = tempfile.mkstemp(prefix="culturate-video-", suffix=suffix)
+    try:
+        headers = {"User-Agent": USER_AGENT, "Range": f"bytes=0-{max_bytes - 1}"}
+        with os.fdopen(fd, "wb") as f, requests.get(url, headers=headers, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            written = 0
+            for chunk in response.iter_content(chunk_size=256 * 1024):
+                f.write(chunk[:max_bytes - written])
+                written += len(chunk)
+                if written >= max_bytes or time.monotonic() > deadline:
+                    break
+        logger.info("Buffered %s bytes of video: %s", min(written, max_bytes), url)
+        return path
+    except Exception as e:
+        logger.warning("Could not download video %s: %s", url, e)
+        os.unlink(path)
+        return None
+
+
+def extract_keyframes(
+    path: str,
+    max_frames: int = KEYFRAME_MAX_FRAMES,
+    max_seconds: float = VIDEO_MAX_SECONDS,
+    scene_threshold: float = SCENE_THRESHOLD,
+    max_side: int = KEYFRAME_MAX_SIDE,
+    timeout: float = EXTRACT_TIMEOUT_SECONDS,
+) -> List[bytes]:
+    """Return up to ``max_frames`` JPEG keyframes from the start of a local video file."""
+    backend = keyframe_backend()
+    try:
+        if backend == "pyav":
+            frames = _extract_with_pyav(path, max_frames, max_seconds, scene_threshold, max_side, timeout)
+        elif backend == "ffmpeg":
+            frames = _extract_with_ffmpeg(path, max_frames, max_seconds, scene_threshold, max_side, timeout)
+        else:
+            return []
+    except Exception as e:
+        logger.warning("Keyframe extraction with %s failed for %s: %s", backend, path, e)
+        return []
+    return evenly_spaced(frames, max_frames)
+
+
+def sample_keyframes(url: str, max_bytes: int = VIDEO_MAX_BYTES, **options) -> List[bytes]:
+    """Download the start of ``url`` and extract its keyframes. Blocking; run it in a thread."""
+    if keyframe_backend() is None:
+        return []
+    path = download_prefix(url, max_bytes=max_bytes)
+    if path is None:
+        return []
+    try:
+        return extract_keyframes(path, **options)
+    finally:
+        os.unlink(path)
+
+
+def _encode_jpeg(image) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=JPEG_QUALITY)
+    return output.getvalue()
+
+
+def _extract_with_pyav(path, max_frames, max_seconds, scene_threshold, max_side, timeout) -> List[bytes]:
+    deadline = time.monotonic() + timeout
+    frames = []
+    last_signature = None
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        # Only decode intra frames; they are cheap to reach and start most shots
+        stream.codec_context.skip_frame = "NONKEY"
+        for frame in container.decode(stream):
+            if frame.time is not None and frame.time > max_seconds:
+                break
+            if time.monotonic() > deadline or len(frames) >= max_frames * CANDIDATE_FACTOR:
+                break
+
+            image = frame.to_image()
+            signature = image.convert("L").resize((16, 16))
+            if last_signature is not None:
+                change = ImageStat.Stat(ImageChops.difference(signature, last_signature)).mean[0] / 255
+                if change < scene_threshold:
+                    continue
+            last_signature = signature
+
+            image.thumbnail((max_side, max_side))
+            frames.append(_encode_jpeg(image.convert("RGB")))
+    return frames
+
+
+def _extract_with_ffmpeg(path, max_frames, max_seconds, scene_threshold, max_side, timeout) -> List[bytes]:
+    video_filter = (
+        f"select='eq(n\\,0)+gt(scene\\,{scene_threshold})',"
+        f"scale='min({max_side}\\,iw)':'min({max_side}\\,ih)':force_original_aspect_ratio=decrease"
+    )
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-t", str(max_seconds), "-i", path,
+        "-vf", video_filter, "-vsync", "vfr",
+        "-frames:v", str(max_frames * CANDIDATE_FACTOR),
+        "-f", "image2pipe", "-c:v", "mjpeg", "-q:v", "5", "-",
+    ]
+    completed = subprocess.run(command, capture_output=True, timeout=timeout, check=True)
+    return _split_jpeg_stream(completed.stdout)
+
+
+def _split_jpeg_stream(data: bytes) -> List[bytes]:
+    """Split concatenated JPEGs from ``image2pipe`` at their end/start markers."""
+    frames = []
+    start = data.find(b"\xff\xd8")
+    while start != -1:
+        end = data.find(b"\xff\xd9\xff\xd8", start)
+        if end == -1:
+            frames.append(data[start:])
+            break
+        frames.append(data[start:end + 2])
+        start = end + 2
+    return [frame for frame in frames if frame.endswith(b"\xff\xd9")]